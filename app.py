@@ -1,19 +1,28 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 import base64
-from PIL import Image
+import hashlib
+import itertools
 from io import BytesIO
+from collections import Counter
 from streamlit_option_menu import option_menu
-from utils import load_prompt, generate_response_llm
+from response_cache import response_cache
+from ratelimit import gemini_limiter, call_with_backoff, current_session_id, session_scope
+from jobs import job_queue, JOB_POLL_SECONDS
+from batch import generate_batch, BATCH_MAX_WORKERS
+from table_parser import StreamingTableParser
+from dataset_cache import load_dataset, dataset_key, ingest_report
+from patients import get_patient_index
+from profiling import get_profile, PROFILE_SAMPLE_ROWS
+from tables import show_table, TABLE_PAGE_ROWS
+from metrics import span
+from normalize import relabel_columns
+from results_store import append_results, list_patients, list_parameters, query_results, store_version
 import logging
-import time
-from google.api_core.exceptions import ResourceExhausted
-from langdetect import detect  # Import langdetect for language detection
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
+
+# Heavy libraries (plotly, PIL, reportlab, langdetect, google SDKs) are imported inside
+# the pages that use them so the login form renders without loading them.
+# Run `python -m benchmarks.bench_imports --check` after touching the imports above.
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -53,38 +62,10 @@ def login():
                     st.session_state.login_attempts = 0
 
 def create_pdf(response):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    story = []
-
-    styles = getSampleStyleSheet()
-
-    response_lines = response.strip().split("\n")
-    response_data = [line.split("|")[1:-1] for line in response_lines]
+    from reports import response_report
 
-    col_widths = [doc.width * 0.21, doc.width * 0.23, doc.width * 0.23, doc.width * 0.21]
-    response_table = Table(response_data, colWidths=col_widths)
-    
-    response_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.darkgrey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 6),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-    ]))
-
-    story.append(Paragraph("<b>Response:</b>", styles['Heading2']))
-    story.append(response_table)
-    story.append(Paragraph("<br/>", styles['Normal']))
-
-    doc.build(story)
-
-    buffer.seek(0)
-    return buffer
+    # Paginated, auto-sized and cached by response content (see reports.py)
+    return BytesIO(response_report([("Response:", response)]))
 
 def show_welcome_popup():
     st.markdown("""
@@ -141,81 +122,308 @@ def get_base64_image(img_path):
         st.error(f"Image file {img_path} not found.")
         return None
 
-def generate_response_with_retry(*args, **kwargs):
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            response = generate_response_llm(*args, **kwargs)
-            logging.info("API response received successfully.")
-            return response
-        except ResourceExhausted as e:
-            logging.warning(f"Quota exceeded, retrying... ({attempt + 1}/{max_retries})")
-            if attempt < max_retries - 1:
-                time.sleep(5)  # Wait before retrying
-            else:
-                logging.error("Quota exceeded. Please try again later.")
-                st.error("Quota exceeded. Please try again later.")
-                raise e
-
-def extract_table_from_response(response):
+MAX_RETRIES = 3
+
+def log_retry(attempt, delay, e):
+    logging.warning(f"Quota exceeded, retrying in {delay:.1f}s... ({attempt + 1}/{MAX_RETRIES})")
+
+def request_with_backoff(*args, **kwargs):
+    from google.api_core.exceptions import ResourceExhausted
+    from utils import generate_response_llm
+
+    # No Streamlit calls in here: batch extraction runs it on worker threads
+    # Backoff is shared through the limiter so concurrent sessions don't retry in lockstep
+    with span("llm.request", retries=0) as fields:
+        def on_retry(attempt, delay, e):
+            fields["retries"] = attempt + 1
+            log_retry(attempt, delay, e)
+
+        response = call_with_backoff(generate_response_llm, *args, retry_on=(ResourceExhausted,),
+                                     max_retries=MAX_RETRIES, limiter=gemini_limiter,
+                                     on_retry=on_retry, **kwargs)
+    logging.info("API response received successfully.")
+    return response
+
+def stream_response_with_retry(**kwargs):
+    from google.api_core.exceptions import ResourceExhausted
+    from utils import generate_response_llm_stream
+
+    # Runs in the background extraction job, so no Streamlit calls in here either.
+    # Retries only cover opening the stream: once chunks are on screen we don't start over
+    def open_stream():
+        stream = generate_response_llm_stream(**kwargs)
+        return next(stream, ""), stream
+
+    with span("llm.open_stream", retries=0) as fields:
+        def on_retry(attempt, delay, e):
+            fields["retries"] = attempt + 1
+            log_retry(attempt, delay, e)
+
+        first_chunk, stream = call_with_backoff(open_stream, retry_on=(ResourceExhausted,),
+                                                max_retries=MAX_RETRIES, limiter=gemini_limiter,
+                                                on_retry=on_retry)
+    yield first_chunk
+    yield from stream
+
+def save_extraction(responses, df):
+    digest = hashlib.sha256("\x00".join(response for _, response in responses).encode("utf-8")).hexdigest()
+    st.session_state.extraction = {"id": digest, "responses": responses, "table": df}
+    # Every extraction is kept so it can be queried later from the data pages
     try:
-        # Split the response into lines
-        lines = response.strip().split("\n")
-
-        # Check if there are enough lines in the response
-        if len(lines) < 2:
-            return pd.DataFrame()  # Return empty DataFrame if not enough lines
-
-        # Determine headers based on the first non-empty line
-        first_line = lines[0].strip()
-        if "|" in first_line:
-            headers = [header.strip() for header in first_line.split("|") if header.strip()]
+        with span("store.append") as fields:
+            stored = append_results(digest, df, source=responses[0][0] if len(responses) == 1 else None)
+            fields["rows"] = stored
+        if stored:
+            logging.info(f"Stored {stored} extracted rows")
+    except Exception as e:
+        logging.error(f"Error storing extraction: {e}")
+
+def upload_names(uploaded_files):
+    # Names that tell the uploads apart: phone photos often share one ("image.jpg"), and the
+    # results, page order and hashes of an extraction are keyed by name
+    counts = Counter(uploaded_file.name for uploaded_file in uploaded_files)
+    seen = Counter()
+    names = []
+    for uploaded_file in uploaded_files:
+        seen[uploaded_file.name] += 1
+        names.append(uploaded_file.name if counts[uploaded_file.name] == 1
+                     else f"{uploaded_file.name} ({seen[uploaded_file.name]})")
+    return names
+
+def extraction_job_key(images, known_responses, user_question, prompt):
+    # Same photos, pages, question and prompt -> same job, so a resubmission isn't billed twice
+    digest = hashlib.sha256()
+    for part in (user_question, prompt):
+        digest.update(part.encode("utf-8") + b"\x00")
+    for name, image in images:
+        digest.update(name.encode("utf-8") + b"\x00" + hashlib.sha256(image["data"]).digest())
+    for name, response in known_responses:
+        digest.update(name.encode("utf-8") + b"\x00" + response.encode("utf-8") + b"\x00")
+    return digest.hexdigest()
+
+def run_extraction(job, session_id, **kwargs):
+    # Runs on the job queue, not the script thread: model calls are queued as the session that
+    # sent the job (batch workers inherit it), not as the job's worker thread
+    with session_scope(session_id):
+        return _run_extraction(job, **kwargs)
+
+def _run_extraction(job, images, known_responses, page_order, photo_hashes, user_question, prompt,
+                    max_workers, stream):
+    # No Streamlit calls in here. Partial text, tables and page counts go to job.update() for
+    # the page to poll; the result is saved by the page.
+    from utils import extract_table_from_response
+    from image_index import remember_image
+
+    result = {"responses": [], "table": pd.DataFrame(), "errors": [], "empty": []}
+    with span("extractor.request", images=len(images), known=len(known_responses), stream=stream):
+        if len(images) == 1 and not known_responses:
+            name, image = images[0]
+            if stream:
+                # Text and table rows are published as they arrive instead of at the end
+                parser = StreamingTableParser()
+                chunks = []
+                for chunk in stream_response_with_retry(input_question=user_question, image=image, prompt=prompt):
+                    chunks.append(chunk)
+                    job.update(text="".join(chunks))
+                    if parser.feed(chunk):
+                        job.update(table=parser.frame())
+                parser.close()
+                response = "".join(chunks)
+            else:
+                response = request_with_backoff(input_question=user_question, image=image, prompt=prompt)
+            df = extract_table_from_response(response)
+            if not df.empty:
+                with span("table.normalize", rows=len(df)):
+                    df = relabel_columns(df)
+                if name in photo_hashes:
+                    remember_image(photo_hashes[name], name, response)
+            result.update(responses=[(name, response)], table=df)
+            return result
+
+        # Several photos or PDF pages: run the model calls concurrently and merge as they land.
+        # PDF text layers and reused answers are already markdown and skip the model.
+        responses = {}
+        frames = {}
+        results = itertools.chain(
+            ((name, text, None) for name, text in known_responses),
+            generate_batch(images, request_with_backoff, max_workers=max_workers,
+                           input_question=user_question, prompt=prompt))
+        for done, (name, response, error) in enumerate(results, start=1):
+            job.update(done=done, total=len(page_order))
+            if error is not None:
+                result["errors"].append((name, str(error)))
+                continue
+            responses[name] = response
+            df = extract_table_from_response(response)
+            if df.empty:
+                result["empty"].append(name)
+                continue
+            with span("table.normalize", rows=len(df)):
+                df = relabel_columns(df)
+            if name in photo_hashes:
+                remember_image(photo_hashes[name], name, response)
+            df.insert(0, "Source Image", name)
+            frames[name] = df
+            job.update(table=pd.concat(frames.values(), ignore_index=True))
+        # Merged in upload and page order, whatever order the calls finished in
+        ordered = [name for name in page_order if name in frames]
+        result["responses"] = [(name, responses[name]) for name in page_order if name in responses]
+        if ordered:
+            result["table"] = pd.concat([frames[name] for name in ordered], ignore_index=True)
+    return result
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def follow_extraction_job():
+    # Reruns on its own every JOB_POLL_SECONDS while the rest of the page stays responsive;
+    # a rerun or page switch never touches the job, the next visit picks it up again
+    job_id = st.session_state.get("extraction_job")
+    if job_id is None:
+        return
+    job = job_queue.get(job_id)
+    if job is not None and job["state"] not in ("done", "failed"):
+        progress = job["progress"]
+        if "total" in progress:
+            st.progress(progress["done"] / progress["total"],
+                        text=f"Processed {progress['done']}/{progress['total']} pages")
         else:
-            # Fallback if first line does not contain '|'
-            headers = ['Header1', 'Header2', 'Header3', 'Header4', 'Header5']  # Example default headers
-
-        data = []
-        for line in lines[1:]:  # Skip the first line if it is a header
-            # Skip lines that contain symbols like '---'
-            if '---' in line:
-                continue  # Skip this line
-
-            # Split each line by '|' and strip whitespace
-            row = [cell.strip() for cell in line.split("|") if cell.strip()]
-
-            # Append rows that match the number of headers and are not empty
-            if len(row) == len(headers) and any(row):
-                data.append(row)
+            st.info("Processing...")
+        if "text" in progress:
+            st.markdown(progress["text"])
+        if "table" in progress:
+            # Latest rows only: the whole table is shown, paginated, once the job is done
+            st.dataframe(progress["table"].tail(TABLE_PAGE_ROWS))
+        return
+
+    # Finished: outcome messages are kept for the full rerun, which shows the saved extraction
+    del st.session_state["extraction_job"]
+    messages = []
+    if job is None:
+        messages.append(("warning", "The extraction expired before it could be shown. Please send it again."))
+    elif job["state"] == "failed":
+        from google.api_core.exceptions import ResourceExhausted
+
+        if isinstance(job["error"], ResourceExhausted):
+            messages.append(("error", "Quota exceeded. Please try again later."))
+        else:
+            messages.append(("error", f"Extraction failed: {job['error']}"))
+    else:
+        result = job["result"]
+        messages += [("error", f"{name}: {error}") for name, error in result["errors"]]
+        messages += [("warning", f"No table data found in {name}.") for name in result["empty"]]
+        save_extraction(result["responses"], result["table"])
+    st.session_state.extraction_messages = messages
+    st.rerun()
+
+def show_extraction(extraction):
+    from reports import response_report
+
+    responses = extraction["responses"]
+    if len(responses) == 1:
+        st.subheader("Response:")
+        st.write(responses[0][1])
+
+    df = extraction["table"]
+    if df.empty:
+        st.warning("No table data found in the response.")
+        return
+
+    st.subheader("Extracted Table Data:")
+    show_table(df, f"extraction-{extraction['id']}", "extraction")
+
+    csv = df.to_csv(index=False)  # Ensure index is not included
+    st.download_button(
+        label="Download CSV",
+        data=csv,
+        file_name="table_data.csv",
+        mime="text/csv"
+    )
+
+    # The PDF is only built when asked for, then served from the report cache
+    if st.button("Prepare PDF report") or st.session_state.get("pdf_ready") == extraction["id"]:
+        st.session_state.pdf_ready = extraction["id"]
+        with st.spinner("Building PDF..."), span("pdf.build", responses=len(responses)) as fields:
+            if len(responses) == 1:
+                pdf = create_pdf(responses[0][1]).getvalue()
             else:
-                logging.warning(f"Skipped malformed line: {line}")
-
-        # Create a DataFrame with placeholder columns
-        df = pd.DataFrame(data)
-        
-        # Debugging statements
-        logging.info(f"DataFrame shape before renaming columns: {df.shape}")
-        logging.info(f"Number of headers: {len(headers)}")
-        logging.info(f"Headers: {headers}")
-
-        # Ensure the number of headers matches the number of DataFrame columns
-        if len(headers) != df.shape[1]:
-            logging.error(f"Column length mismatch: {len(headers)} headers but {df.shape[1]} columns in DataFrame")
-            # Handle mismatch, e.g., truncate or pad headers to match DataFrame columns
-            headers = headers[:df.shape[1]]  # Adjust headers to match the number of DataFrame columns
+                pdf = response_report(responses)
+            fields["pdf_bytes"] = len(pdf)
+        st.download_button(
+            label="Download Response as PDF",
+            data=pdf,
+            file_name="response.pdf",
+            mime="application/pdf"
+        )
+
+def load_data(file):
+    # Parsed once per upload content and shared by both data pages and all sessions
+    data = load_dataset(file)
+    if data is None:
+        st.warning("Unsupported file format. Please upload a CSV or Excel file.")
+    return data
+
+def load_stored_results(page):
+    # Filters go to the results store as SQL, so only the matching rows are loaded
+    patients = list_patients()
+    if not patients:
+        st.info("No extraction stored yet. Tables extracted on the Extractor page appear here.")
+        return None, None
+    patient = st.selectbox("Patient", ["All patients"] + patients, key=f"{page}_stored_patient")
+    patient = None if patient == "All patients" else patient
+    parameters = st.multiselect("Parameters", list_parameters(patient), key=f"{page}_stored_parameters")
+    today = pd.Timestamp.today().date()
+    dates = st.date_input("Extraction dates", value=(today - pd.Timedelta(days=365), today),
+                          key=f"{page}_stored_dates")
+    since = dates[0] if dates else None
+    until = dates[1] + pd.Timedelta(days=1) if len(dates) > 1 else None
+
+    data = query_results(patient=patient, parameters=parameters, since=since, until=until)
+    if data.empty:
+        st.warning("No stored result matches these filters.")
+        return None, None
+    # New extractions change the version, so indexes built on an older result set are not reused
+    key = hashlib.sha256(repr((patient, parameters, since, until, store_version())).encode("utf-8")).hexdigest()
+    return data, f"store-{key}"
+
+def choose_data(page):
+    # (data, cache key) from an uploaded file or from the stored extractions
+    source = st.radio("Data source", ["Upload a file", "Stored extractions"], horizontal=True, key=f"{page}_source")
+    if source == "Stored extractions":
+        return load_stored_results(page)
+    file = st.file_uploader("Upload your DataSet in CSV or EXCEL format", type=["csv", "xls", "xlsx"])
+    if file is None:
+        return None, None
+    data = load_data(file)
+    if data is None:
+        return None, None
+    return data, dataset_key(file)
+
+def show_ingest_report(key, details=False):
+    report = ingest_report(key)
+    if report is None:
+        return
+    if report.get("out_of_core"):
+        st.info(f"Large file: working on a random sample of {report['rows']:,} rows "
+                f"out of {report['total_rows']:,}. Totals below cover the whole file.")
+    if not details:
+        return
+    with st.expander("Ingestion report"):
+        st.write(f"Rows loaded: {report['rows']:,}")
+        st.write(f"Memory: {report['bytes_before'] / 1024 ** 2:.1f} MB parsed → "
+                 f"{report['bytes_after'] / 1024 ** 2:.1f} MB after dtype downcasting")
+        aggregates = report.get("aggregates")
+        if aggregates:
+            st.write("Whole-file numeric aggregates:")
+            st.dataframe(pd.DataFrame(aggregates["numeric"]).T)
+            for column, counts in aggregates["top_values"].items():
+                st.write(f"Most frequent values of {column}:")
+                st.dataframe(pd.Series(counts, name="count"))
 
-        df.columns = headers  # Update DataFrame columns with new headers
-
-        return df
-
-    except Exception as e:
-        logging.error(f"Error extracting table data: {e}")
-        return pd.DataFrame()  # Return empty DataFrame in case of any error
 def main_app():
     # Sidebar menu
     with st.sidebar:
         selected = option_menu('Dashboard',
-                              ['Home', 'Extractor', 'Data Analysis', 'Data Visualization'],
-                              icons=['house', 'activity', 'bar-chart', 'file-text'],
+                              ['Home', 'Extractor', 'Data Analysis', 'Data Visualization', 'Metrics'],
+                              icons=['house', 'activity', 'bar-chart', 'file-text', 'speedometer'],
                               default_index=0)
     
     # Update page selection in session state
@@ -280,145 +488,187 @@ def main_app():
     elif st.session_state.page == 'Data Analysis':
         st.markdown("<h2 style='color: #FF5733;'><em>Data Analysis :</em></h2>", unsafe_allow_html=True)
 
-        def load_data(file):
-            file_extension = file.name.split(".")[-1].lower()  # Ensure lowercase extension
-            if file_extension == "csv":
-                data = pd.read_csv(file)
-            elif file_extension in ["xls", "xlsx"]:
-                data = pd.read_excel(file)
-            else:
-                st.warning("Unsupported file format. Please upload a CSV or Excel file.")
-                return None
-            return data
-
-        file = st.file_uploader("Upload your DataSet in CSV or EXCEL format", type=["csv", "xls", "xlsx"])
-        if file is not None:
-            data = load_data(file)
-            if data is not None:
-                st.markdown("<h4 style='color: #FF7F50;'><em>Preview of Loaded Dataset :</em></h4>", unsafe_allow_html=True)
-                st.dataframe(data.head())
-                
-                if 'Name' in data.columns:
-                    patient_names = data['Name'].unique()
+        data, key = choose_data("analysis")
+        if data is not None:
+            show_ingest_report(key, details=True)
+            st.markdown("<h4 style='color: #FF7F50;'><em>Preview of Loaded Dataset :</em></h4>", unsafe_allow_html=True)
+            show_table(data, key, "analysis")
+
+            # Statistics are computed once per dataset, not on every rerun
+            sample = st.checkbox(f"Profile a sample of {PROFILE_SAMPLE_ROWS:,} rows for large datasets", value=True,
+                                 key="analysis_profile_sample")
+            profile = get_profile(key, data, sample)
+            st.markdown("<h4 style='color: #FF7F50;'><em>Descriptive Statistics :</em></h4>", unsafe_allow_html=True)
+            if profile.sampled:
+                st.caption(f"Computed on a random sample of {profile.rows:,} rows out of {len(data):,}.")
+            st.dataframe(profile.summary)
+
+            if 'Name' in data.columns:
+                # Index built once per dataset: switching patients is a dict lookup, not a rescan
+                patient_index = get_patient_index(key, data)
+                search = st.text_input(f"Search among {len(patient_index):,} patients", key="patient_search")
+                patient_names = patient_index.search(search)
+                if patient_names:
                     selected_name = st.selectbox("Select Patient Name", patient_names)
                     st.write(f"Welcome, {selected_name}!")
+
+                    summary = patient_index.summary(selected_name)
+                    st.markdown(f"<h4 style='color: #FF7F50;'><em>Records of {selected_name} ({summary['rows']:,}) :</em></h4>", unsafe_allow_html=True)
+                    show_table(patient_index.rows(selected_name), f"{key}-{selected_name}", "patient_rows")
+                    if not summary['stats'].empty:
+                        st.dataframe(summary['stats'])
                 else:
-                    st.warning("The dataset does not contain a 'Name' column.")
+                    st.warning("No patient matches this search.")
+            else:
+                st.warning("The dataset does not contain a 'Name' column.")
 
     elif st.session_state.page == 'Data Visualization':
+        from charts import build_figure
+
         st.markdown("<h1 style='color: #FF5733;'><em>Data Visualization :</em></h1>", unsafe_allow_html=True)
 
-        def load_data(file):
-            file_extension = file.name.split(".")[-1].lower()  # Ensure lowercase extension
-            if file_extension == "csv":
-                data = pd.read_csv(file)
-            elif file_extension in ["xls", "xlsx"]:
-                data = pd.read_excel(file)
-            else:
-                st.warning("Unsupported file format. Please upload a CSV or Excel file.")
-                return None
-            return data
-
-        file = st.file_uploader("Upload your DataSet in CSV or EXCEL format", type=["csv", "xls", "xlsx"])
-        if file is not None:
-            data = load_data(file)
-            if data is not None:
-                st.markdown("<h2 style='color: #FF5733;'><em>Data Preview</em></h2>", unsafe_allow_html=True)
-                st.write(data.head())
-
-                chart_type = st.selectbox("Select Chart Type", ["Bar Chart", "Line Chart", "Scatter Plot", "Histogram", "Pie Chart"])
-
-                if chart_type in ["Bar Chart", "Line Chart"]:
-                    x_column = st.selectbox("Select X Column", data.columns)
-                    y_column = st.selectbox("Select Y Column", data.columns)
-                elif chart_type == "Scatter Plot":
-                    x_column = st.selectbox("Select X Column (Numeric)", data.select_dtypes(include=['int', 'float']).columns)
-                    y_column = st.selectbox("Select Y Column (Numeric)", data.select_dtypes(include=['int', 'float']).columns)
-                elif chart_type == "Histogram":
-                    x_column = st.selectbox("Select Column for Histogram", data.columns)
-                elif chart_type == "Pie Chart":
-                    x_column = st.selectbox("Select Column for Pie Chart", data.columns)
-
-                fig = None
-
-                if chart_type == "Bar Chart":
-                    fig = px.bar(data, x=x_column, y=y_column, title=f"Bar Chart: {y_column} vs {x_column}")
-                elif chart_type == "Line Chart":
-                    fig = px.line(data, x=x_column, y=y_column, title=f"Line Chart: {y_column} vs {x_column}", width=800, height=600)
-                elif chart_type == "Scatter Plot":
-                    fig = px.scatter(data, x=x_column, y=y_column, title=f"Scatter Plot: {y_column} vs {x_column}", width=800, height=600)
-                elif chart_type == "Histogram":
-                    fig = px.histogram(data, x=x_column, title=f"Histogram: {x_column}")
-                elif chart_type == "Pie Chart":
-                    fig = px.pie(data, names=x_column, title=f"Pie Chart: {x_column}")
-
-                if fig:
-                    st.plotly_chart(fig)
+        data, key = choose_data("visualization")
+        if data is not None:
+            show_ingest_report(key)
+            st.markdown("<h2 style='color: #FF5733;'><em>Data Preview</em></h2>", unsafe_allow_html=True)
+            st.write(data.head())
+
+            chart_type = st.selectbox("Select Chart Type", ["Bar Chart", "Line Chart", "Scatter Plot", "Histogram", "Pie Chart"])
+
+            y_column = None
+            if chart_type in ["Bar Chart", "Line Chart"]:
+                x_column = st.selectbox("Select X Column", data.columns)
+                y_column = st.selectbox("Select Y Column", data.columns)
+            elif chart_type == "Scatter Plot":
+                x_column = st.selectbox("Select X Column (Numeric)", data.select_dtypes(include='number').columns)
+                y_column = st.selectbox("Select Y Column (Numeric)", data.select_dtypes(include='number').columns)
+            elif chart_type == "Histogram":
+                x_column = st.selectbox("Select Column for Histogram", data.columns)
+            elif chart_type == "Pie Chart":
+                x_column = st.selectbox("Select Column for Pie Chart", data.columns)
+
+            # Large datasets are downsampled or pre-aggregated before they reach the browser
+            fig, notes = build_figure(data, chart_type, x_column, y_column)
+            for note in notes:
+                st.info(note)
+
+            if fig:
+                st.plotly_chart(fig)
+
+    elif st.session_state.page == 'Metrics':
+        from dashboard import show_metrics
+
+        # Per-stage latency, cache and error rates from the span log
+        show_metrics()
 
     elif st.session_state.page == 'Extractor':
+        from preprocess import prepare_photo, format_report
+        from image_index import find_near_duplicate
+        from utils import load_prompt
+
         user_question = st.text_input("Input prompt", key="input")
 
         st.sidebar.title("Invoice Image")
 
-        uploaded_file = st.sidebar.file_uploader("Choose an image...", type=["jpg", "png", "jpeg"])
-
-        image = None
-        if uploaded_file is not None:
-            image = Image.open(uploaded_file)
-            st.image(image, caption="Uploaded image", use_column_width=True)
+        uploaded_files = st.sidebar.file_uploader("Choose images or PDF reports...",
+                                                  type=["jpg", "png", "jpeg", "pdf"],
+                                                  accept_multiple_files=True)
+
+        printed_sheet = st.sidebar.checkbox("Printed lab sheet (grayscale + contrast)", value=False)
+        stream_response = st.sidebar.checkbox("Stream response", value=True)
+
+        images = []
+        known_responses = []  # PDF text-layer tables and reused earlier answers: no model call
+        photo_hashes = {}  # Photo name -> perceptual hash, recorded once the photo is extracted
+        page_order = []  # Every image and page name, to merge the results in document order
+        max_workers = BATCH_MAX_WORKERS
+        if uploaded_files:
+            columns = st.columns(min(len(uploaded_files), 3))
+            for i, (uploaded_file, name) in enumerate(zip(uploaded_files, upload_names(uploaded_files))):
+                if uploaded_file.name.lower().endswith(".pdf"):
+                    from pdf_input import read_pdf, PDF_MAX_CONCURRENT_PAGES
+
+                    with span("pdf.read", bytes=uploaded_file.size) as fields:
+                        pages, skipped = read_pdf(uploaded_file.getvalue(), name, grayscale=printed_sheet)
+                        fields.update(pages=len(pages), skipped=skipped)
+                    for page in pages:
+                        page_order.append(page["name"])
+                        if "text" in page:
+                            known_responses.append((page["name"], page["text"]))
+                        else:
+                            images.append((page["name"], page["image"]))
+                    # Every scanned page of a report in flight at once: it takes as long as its slowest page
+                    max_workers = max(max_workers, min(len(images), PDF_MAX_CONCURRENT_PAGES))
+                    rasterized = [page["image"]["data"] for page in pages if "image" in page]
+                    if rasterized:
+                        columns[i % len(columns)].image(rasterized[0], caption=name, use_column_width=True)
+                    columns[i % len(columns)].caption(f"{len(pages)} pages: {len(pages) - len(rasterized)} read "
+                                                      f"from the text layer, {len(rasterized)} sent to the model")
+                    if skipped:
+                        columns[i % len(columns)].warning(
+                            f"Only the first {len(pages)} of {len(pages) + skipped} pages are extracted; "
+                            f"{skipped} pages were left out (PDF_MAX_PAGES).")
+                    continue
+
+                # Shrink the photo before it is sent; the model gets the compact blob. Cached per
+                # upload, so reruns don't decode and re-encode every photo again.
+                with span("image.preprocess", bytes=uploaded_file.size) as fields:
+                    payload, report, image_hash = prepare_photo(uploaded_file.getvalue(), printed_sheet)
+                    fields.update(bytes_before=report["bytes_before"], bytes_after=report["bytes_after"])
+                page_order.append(name)
+                columns[i % len(columns)].image(payload["data"], caption=name, use_column_width=True)
+                columns[i % len(columns)].caption(format_report(report))
+
+                # Re-shoots of a report extracted before (other crop, lighting) can reuse its table
+                with span("image.hash") as fields:
+                    match = find_near_duplicate(image_hash)
+                    fields["match"] = match is not None
+                if match is not None:
+                    columns[i % len(columns)].warning(
+                        f"Looks like {match['source']}, extracted {match['added_at'][:10]} "
+                        f"({match['distance']}/64 bits differ).")
+                    if columns[i % len(columns)].checkbox("Reuse its table", key=f"reuse_{uploaded_file.file_id}"):
+                        known_responses.append((name, match["response"]))
+                        continue
+                images.append((name, payload))
+                photo_hashes[name] = image_hash
 
         prompt = load_prompt()
 
+        cache_stats = response_cache.stats()
+        st.sidebar.caption(
+            f"Response cache: {cache_stats['memory_hits'] + cache_stats['disk_hits']} hits / "
+            f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%})"
+        )
+        limiter_stats = gemini_limiter.stats()
+        st.sidebar.caption(
+            f"Gemini queue: {limiter_stats['queue_depth']} waiting, "
+            f"p95 wait {limiter_stats['p95_wait']:.1f}s"
+        )
+        job_stats = job_queue.stats()
+        st.sidebar.caption(f"Extraction jobs: {job_stats['running']} running, {job_stats['queued']} queued, "
+                           f"{job_stats['deduplicated']} duplicates skipped")
+
         if st.button("Send"):
-            if image is not None:
-                with st.spinner("Start processing..."):
-                    response = generate_response_with_retry(input_question=user_question, image=image, prompt=prompt)
-                    st.subheader("Response:")
-                    st.write(response)
+            if images or known_responses:
+                # Runs in the background: widget clicks and page switches no longer cancel it
+                st.session_state.extraction_job = job_queue.submit(
+                    extraction_job_key(images, known_responses, user_question, prompt), run_extraction,
+                    session_id=current_session_id(),
+                    images=images, known_responses=known_responses, page_order=page_order,
+                    photo_hashes=photo_hashes, user_question=user_question, prompt=prompt,
+                    max_workers=max_workers, stream=stream_response)
+            else:
+                st.warning("Please upload an image before processing.")
 
-            # Extract table data from response
-            df = extract_table_from_response(response)
-            # Load and preview the DataFrame
-            st.write("Preview of Loaded Dataset:")
-            st.dataframe(df)
+        if st.session_state.get("extraction_job"):
+            follow_extraction_job()
+        for level, message in st.session_state.pop("extraction_messages", []):
+            getattr(st, level)(message)
 
-            if not df.empty:
-                st.subheader("Extracted Table Data:")
-                st.dataframe(df)
-
-                # Detect language and update headers
-                try:
-                    detected_language = detect(response)
-                    if detected_language == 'fr':
-                        headers = ['Nom', 'Paramètre', 'Unité', 'Résultat', 'Valeur']
-                    else:
-                        headers = ['Name', 'Parameter', 'Unit', 'Result', 'Value']
-                except Exception as e:
-                    logging.error(f"Error detecting language: {e}")
-                    headers = ['Name', 'Parameter', 'Unit', 'Result', 'Value']  # Default to English headers
-
-                if len(headers) == df.shape[1]:  # Ensure headers length matches DataFrame columns
-                    df.columns = headers  # Update DataFrame columns with new headers
-             
-
-                csv = df.to_csv(index=False)  # Ensure index is not included
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name="table_data.csv",
-                    mime="text/csv"
-                )
-
-                # Prepare PDF download
-                pdf_buffer = create_pdf(response)
-                st.download_button(
-                    label="Download Response as PDF",
-                    data=pdf_buffer.getvalue(),
-                    file_name="response.pdf",
-                    mime="application/pdf"
-                )
-            else:
-                st.warning("No table data found in the response.")
+        # Results live in the session so downloads and the PDF button survive reruns
+        if st.session_state.get("extraction"):
+            show_extraction(st.session_state.extraction)
     else:
         st.warning("Please upload an image before processing.")
 
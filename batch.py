@@ -0,0 +1,28 @@
+import os
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Upper bound on concurrent model calls for one batch (the rate limiter still applies)
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", "4"))
+
+
+def generate_batch(named_images, generate, max_workers=BATCH_MAX_WORKERS, **kwargs):
+    # Fan the images out to a bounded pool and yield (name, response, error) as each call lands
+    if not named_images:
+        return
+    workers = max(1, min(max_workers, len(named_images)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract") as pool:
+        # Each call runs in a copy of the caller's context, so its timing spans join the caller's trace
+        futures = {pool.submit(contextvars.copy_context().run, generate, image=image, **kwargs): name
+                   for name, image in named_images}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                yield name, future.result(), None
+            except Exception as e:
+                logging.error(f"Extraction failed for {name}: {e}")
+                yield name, None, e
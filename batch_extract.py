@@ -0,0 +1,236 @@
+# Headless bulk extraction: every lab-sheet photo in a directory -> one CSV/Parquet table.
+#
+#   python batch_extract.py scans/ --output results.parquet
+#   python batch_extract.py scans/ --output results.csv --workers 8 --printed --recursive
+#
+# Progress is checkpointed to <output>.checkpoint.jsonl after every image; running the same
+# command again skips the images already answered (unless their file, the question, the
+# prompt or --printed changed) and only retries the failures, without calling the model for
+# the rest.
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import pandas as pd
+from batch import BATCH_MAX_WORKERS
+from ratelimit import call_with_backoff, gemini_limiter
+from normalize import relabel_columns
+from utils import load_prompt, generate_response_llm, extract_table_from_response
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+DEFAULT_QUESTION = "Extract the lab results table"
+MAX_RETRIES = 5
+PROGRESS_EVERY_SECONDS = 10
+
+
+def find_images(directory, recursive=False):
+    # Paths relative to the directory, in a stable order so runs are comparable
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                found.append(os.path.relpath(os.path.join(root, name), directory))
+        if not recursive:
+            break
+    return found
+
+
+class Checkpoint:
+    # Append-only JSONL of finished images:
+    # {"image", "digest", "question", "prompt", "printed", "ok", "response" | "error"}
+
+    def __init__(self, path):
+        self.path = path
+        self.done = {}  # image -> last record
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Last line cut short by an interrupted run
+                    self.done[entry["image"]] = entry
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def answered(self, image, digest, settings):
+        # Answered for this file content and these settings; entries from older runs that
+        # don't record the settings are redone
+        entry = self.done.get(image)
+        return (entry is not None and entry["ok"] and entry["digest"] == digest
+                and all(entry.get(name) == value for name, value in settings.items()))
+
+    def add(self, entry):
+        with self._lock:
+            self.done[entry["image"]] = entry
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def run_settings(question, prompt, printed):
+    # Everything besides the image that changes the answer; the prompt is stored as a hash
+    return {"question": question, "prompt": hashlib.sha256(prompt.encode("utf-8")).hexdigest(),
+            "printed": printed}
+
+
+def extract_one(path, question, prompt, printed):
+    # Runs on a worker thread: decode, pre-process and call the model with backoff
+    from PIL import Image
+    from google.api_core.exceptions import ResourceExhausted
+    from preprocess import preprocess_image
+
+    with open(path, "rb") as f:
+        data = f.read()
+    _, payload, _ = preprocess_image(Image.open(BytesIO(data)), grayscale=printed, normalize_contrast=printed,
+                                     original_bytes=len(data))
+    return call_with_backoff(generate_response_llm, input_question=question, prompt=prompt, image=payload,
+                             retry_on=(ResourceExhausted,), max_retries=MAX_RETRIES, limiter=gemini_limiter)
+
+
+def run(directory, images, checkpoint, workers, question, prompt, printed):
+    # Keeps at most 2 x workers images in flight, so thousands of files never sit in memory at once
+    settings = run_settings(question, prompt, printed)
+    total = len(images)
+    started = time.perf_counter()
+    last_report = started
+    finished = failed = 0
+    queue = iter(images)
+    # Not a with block: leaving one waits for every model call in flight, even on Ctrl-C
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract")
+    in_flight = {}
+
+    def submit_next():
+        item = next(queue, None)
+        if item is None:
+            return False
+        future = pool.submit(extract_one, os.path.join(directory, item[0]), question, prompt, printed)
+        in_flight[future] = item
+        return True
+
+    try:
+        for _ in range(workers * 2):
+            if not submit_next():
+                break
+        while in_flight:
+            completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in completed:
+                image, digest = in_flight.pop(future)
+                try:
+                    checkpoint.add(dict(image=image, digest=digest, **settings, ok=True, response=future.result()))
+                except Exception as e:
+                    logging.error(f"Extraction failed for {image}: {e}")
+                    checkpoint.add(dict(image=image, digest=digest, **settings, ok=False, error=str(e)))
+                    failed += 1
+                finished += 1
+                submit_next()
+
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_EVERY_SECONDS or not in_flight:
+                last_report = now
+                rate = finished / (now - started) * 60
+                remaining = (total - finished) / rate if rate else 0
+                print(f"{finished}/{total} images, {failed} failed, {rate:.1f} images/min, "
+                      f"~{remaining:.0f} min left", file=sys.stderr)
+    except KeyboardInterrupt:
+        # Images not finished yet are simply not checkpointed, so the next run redoes them
+        pool.shutdown(wait=False, cancel_futures=True)
+        raise
+    pool.shutdown()
+    return finished, failed, time.perf_counter() - started
+
+
+def combine(checkpoint, images):
+    # One table for every answered image, from the checkpointed responses
+    frames = []
+    for image, _ in images:
+        entry = checkpoint.done.get(image)
+        if entry is None or not entry["ok"]:
+            continue
+        df = extract_table_from_response(entry["response"])
+        if df.empty:
+            logging.warning(f"No table data found in {image}.")
+            continue
+        df = relabel_columns(df)
+        df.insert(0, "Source Image", image)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def write_output(df, output):
+    if output.lower().endswith(".parquet"):
+        # Extracted columns can mix numbers and text across images
+        mixed = [column for column in df.columns if df[column].dtype == object]
+        df.astype({column: "string" for column in mixed}).to_parquet(output, index=False)
+    else:
+        df.to_csv(output, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract lab tables from every image in a directory.")
+    parser.add_argument("directory")
+    parser.add_argument("--output", default="extracted_tables.parquet", help=".parquet or .csv")
+    parser.add_argument("--checkpoint", help="progress file (default: <output>.checkpoint.jsonl)")
+    parser.add_argument("--workers", type=int, default=BATCH_MAX_WORKERS)
+    parser.add_argument("--question", default=DEFAULT_QUESTION)
+    parser.add_argument("--printed", action="store_true", help="printed lab sheets: grayscale + contrast")
+    parser.add_argument("--recursive", action="store_true")
+    parser.add_argument("--store", action="store_true", help="also append the rows to the results store")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(message)s")
+
+    prompt = load_prompt()
+    settings = run_settings(args.question, prompt, args.printed)
+    checkpoint = Checkpoint(args.checkpoint or f"{args.output}.checkpoint.jsonl")
+    images = [(image, file_digest(os.path.join(args.directory, image)))
+              for image in find_images(args.directory, args.recursive)]
+    pending = [(image, digest) for image, digest in images if not checkpoint.answered(image, digest, settings)]
+    print(f"{len(images)} images found, {len(images) - len(pending)} already done, {len(pending)} to process",
+          file=sys.stderr)
+
+    try:
+        finished, failed, elapsed = run(args.directory, pending, checkpoint, max(1, args.workers),
+                                        args.question, prompt, args.printed)
+    except KeyboardInterrupt:
+        checkpoint.close()
+        print("Interrupted: run the same command again to resume.", file=sys.stderr)
+        sys.stderr.flush()
+        # Calls already sent can't be cancelled, and a normal exit would join their threads
+        os._exit(130)
+    finally:
+        checkpoint.close()
+
+    df = combine(checkpoint, images)
+    write_output(df, args.output)
+    if args.store and not df.empty:
+        from results_store import append_results
+
+        # One stored extraction per image, keyed by the image content so a rerun doesn't add it twice
+        digests = dict(images)
+        for image, rows in df.groupby("Source Image", sort=False):
+            append_results(digests[image], rows)
+    rate = finished / elapsed * 60 if elapsed else 0
+    print(f"Done: {finished} processed ({failed} failed) in {elapsed:.0f}s, {rate:.1f} images/min; "
+          f"{len(df)} rows written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Near-duplicate lookup speed of the perceptual-hash index.
+#
+#   python -m benchmarks.bench_image_index
+#
+# Fills image_index.HashIndex with random 64-bit hashes plus re-shoots of some of them
+# (a few bits flipped), then times searches that hit a re-shoot and searches that miss.
+import time
+import random
+from image_index import HashIndex, NEAR_DUPLICATE_DISTANCE
+
+SIZES = [10000, 100000, 300000]
+QUERIES = 2000
+
+
+def flip_bits(value, bits, rng):
+    for bit in rng.sample(range(64), bits):
+        value ^= 1 << bit
+    return value
+
+
+def time_searches(index, queries):
+    started = time.perf_counter()
+    found = sum(index.search(query, NEAR_DUPLICATE_DISTANCE) is not None for query in queries)
+    return (time.perf_counter() - started) / len(queries) * 1e6, found
+
+
+def main():
+    rng = random.Random(0)
+    print(f"distance <= {NEAR_DUPLICATE_DISTANCE}")
+    print(f"{'hashes':>8} {'build s':>8} {'hit us':>8} {'found':>7} {'miss us':>8} {'found':>7}")
+    for size in SIZES:
+        hashes = [rng.getrandbits(64) for _ in range(size)]
+        index = HashIndex()
+        started = time.perf_counter()
+        for key, value in enumerate(hashes):
+            index.add(key, value)
+        build = time.perf_counter() - started
+
+        near = [flip_bits(rng.choice(hashes), rng.randint(0, NEAR_DUPLICATE_DISTANCE), rng) for _ in range(QUERIES)]
+        far = [rng.getrandbits(64) for _ in range(QUERIES)]
+        hit_us, hits = time_searches(index, near)
+        miss_us, misses = time_searches(index, far)
+        print(f"{size:>8} {build:>8.2f} {hit_us:>8.1f} {hits:>7} {miss_us:>8.1f} {misses:>7}")
+
+
+if __name__ == "__main__":
+    main()
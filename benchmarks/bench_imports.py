@@ -0,0 +1,115 @@
+# Import-time profile of the app's login path.
+#
+#   python -m benchmarks.bench_imports                   # report the slowest imports
+#   python -m benchmarks.bench_imports --check           # fail if a heavy library is back on the login path
+#   python -m benchmarks.bench_imports --check --budget-ms 1500
+#
+# The login path is every module app.py imports at top level, followed through the
+# repo's own modules. Imports inside functions or page branches are not on it.
+import os
+import ast
+import sys
+import subprocess
+
+APP_FILE = "app.py"
+
+# Libraries only the Extractor, Data Visualization and PDF export need
+HEAVY_MODULES = ["plotly", "reportlab", "langdetect", "PIL", "google.generativeai", "google.api_core",
+                 "openai", "pyarrow", "fitz", "pymupdf"]
+# Every page needs these, so whatever they load is not counted against the login path
+BASELINE_MODULES = ["streamlit", "pandas"]
+
+
+def is_heavy(module):
+    return any(module == heavy or module.startswith(heavy + ".") for heavy in HEAVY_MODULES)
+
+
+def top_level_imports(path):
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    modules = []
+    for node in tree.body:  # Module level only: function and branch bodies are deferred
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            modules.append(node.module)
+    return modules
+
+
+def login_path_imports(entry=APP_FILE):
+    # Follow local modules so a heavy import hidden in a helper module is still caught
+    seen, external, pending = set(), [], [entry]
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        for module in top_level_imports(path):
+            local_path = module.replace(".", os.sep) + ".py"
+            if os.path.exists(local_path):
+                pending.append(local_path)
+            elif module not in external:
+                external.append(module)
+    return external, sorted(seen)
+
+
+def profile(modules):
+    # Runs `python -X importtime` in a fresh interpreter and parses its report
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True)
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        name = fields[2][1:].rstrip()  # Leading spaces give the nesting depth
+        timings.append((name, int(fields[0]), int(fields[1])))
+    return timings, result.returncode, result.stderr
+
+
+def main(argv):
+    external, local_files = login_path_imports()
+    heavy = [module for module in external if is_heavy(module)]
+
+    print(f"Local modules on the login path: {', '.join(local_files)}")
+    print(f"External imports on the login path: {', '.join(external)}")
+
+    timings, returncode, stderr = profile(external)
+    if returncode != 0:
+        print("Some login-path imports failed in this environment:")
+        print(stderr.splitlines()[-1] if stderr else "")
+    top_level = [entry for entry in timings if not entry[0].startswith(" ")]
+    total_ms = sum(cumulative for _, _, cumulative in top_level) / 1000
+    print(f"\nTotal import time: {total_ms:.0f} ms")
+    print(f"{'module':<50} {'cumulative ms':>14}")
+    for name, _, cumulative in sorted(timings, key=lambda entry: -entry[2])[:15]:
+        print(f"{name:<50} {cumulative / 1000:>14.1f}")
+
+    if "--check" not in argv:
+        return 0
+    failed = False
+    if heavy:
+        print(f"\nFAIL: heavy modules imported on the login path: {', '.join(heavy)}")
+        failed = True
+    # Streamlit and pandas pull in some of these themselves (PIL, and pyarrow whenever it is
+    # installed); only flag what we add on top
+    baseline, _, _ = profile(BASELINE_MODULES)
+    baseline_names = {name.strip() for name, _, _ in baseline}
+    loaded_heavy = sorted({name.strip() for name, _, _ in timings
+                           if is_heavy(name.strip()) and name.strip() not in baseline_names})
+    if loaded_heavy:
+        print(f"\nFAIL: heavy modules loaded indirectly: {', '.join(loaded_heavy)}")
+        failed = True
+    if "--budget-ms" in argv:
+        budget = float(argv[argv.index("--budget-ms") + 1])
+        if total_ms > budget:
+            print(f"\nFAIL: login path imports take {total_ms:.0f} ms, budget is {budget:.0f} ms")
+            failed = True
+    if not failed:
+        print("\nOK: login path is free of heavy imports")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,46 @@
+# Lab-parameter normalization speed on large extracted tables.
+#
+#   python -m benchmarks.bench_normalize
+#
+# Times normalize.normalize_table on synthetic extractions mixing French and English
+# labels and units, and reports how many rows got a canonical value.
+import time
+import random
+import pandas as pd
+from normalize import FRENCH_HEADERS, normalize_table, STANDARD_RESULT, canonical_parameter, canonical_unit
+
+SIZES = [1000, 10000, 100000]
+LABELS = [("Glycémie", "g/L", 0.7, 1.3), ("Glucose", "mg/dL", 70, 130), ("Glycémie à jeun", "mmol/L", 4, 7),
+          ("Créatinine", "mg/L", 6, 12), ("Creatinine", "µmol/L", 50, 110), ("Cholestérol HDL", "g/L", 0.4, 0.8),
+          ("LDL-C", "mg/dL", 80, 160), ("Leucocytes", "G/L", 4, 10), ("Plaquettes", "/mm³", 150000, 400000),
+          ("Hémoglobine", "g/dL", 12, 17), ("TGO (ASAT)", "UI/L", 10, 40), ("Commentaire", "", 0, 0)]
+
+
+def synthetic_table(rows, seed=0):
+    rng = random.Random(seed)
+    data = []
+    for i in range(rows):
+        label, unit, low, high = rng.choice(LABELS)
+        result = f"{rng.uniform(low, high):.2f}".replace(".", ",")
+        data.append([f"Patient {i % 300}", label, unit, result, ""])
+    return pd.DataFrame(data, columns=FRENCH_HEADERS)
+
+
+def main():
+    print(f"{'rows':>8} {'cold ms':>9} {'warm ms':>9} {'canonical':>10} {'rows/s':>12}")
+    for size in SIZES:
+        df = synthetic_table(size)
+        canonical_parameter.cache_clear()
+        canonical_unit.cache_clear()
+        started = time.perf_counter()
+        normalize_table(df)
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        normalized = normalize_table(df)
+        warm = time.perf_counter() - started
+        print(f"{size:>8} {cold * 1000:>9.1f} {warm * 1000:>9.1f} {normalized[STANDARD_RESULT].notna().sum():>10} "
+              f"{size / warm:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
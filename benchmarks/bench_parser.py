@@ -0,0 +1,81 @@
+# Markdown table parsing speed on large synthetic model responses.
+#
+#   python -m benchmarks.bench_parser
+#
+# Compares table_parser with the loop the Extractor used before it. That loop only splits
+# cells: it drops ragged rows, reads one table and leaves every column as text. The
+# "split ms" column is table_parser doing the same job (raw_tables); "typed ms" adds
+# merging same-header tables and typing the numeric columns (parse_table).
+import time
+import random
+import logging
+import pandas as pd
+from table_parser import parse_table, raw_tables
+
+SIZES = [1000, 10000, 100000]
+PARAMETERS = [("Glycémie", "g/L"), ("Hémoglobine", "g/dL"), ("Créatinine", "mg/L"), ("Cholestérol", "g/L")]
+
+
+def synthetic_response(rows, seed=0):
+    rng = random.Random(seed)
+    lines = ["Voici le tableau extrait :", "", "| Nom | Paramètre | Unité | Résultat | Valeur |",
+             "|---|---|---|---|---|"]
+    for i in range(rows):
+        parameter, unit = rng.choice(PARAMETERS)
+        result = f"{rng.uniform(0.1, 20):.2f}".replace(".", ",")
+        if i % 50 == 49:
+            lines.append(f"| Patient {i % 300} | {parameter} | {unit} | {result} |")  # Ragged row
+        else:
+            lines.append(f"| Patient {i % 300} | {parameter} | {unit} | {result} | 0,7-1,1 |")
+    return "\n".join(lines)
+
+
+def legacy_extract_table(response):
+    # The Extractor's parser before table_parser (kept here for comparison only)
+    lines = response.strip().split("\n")
+    if len(lines) < 2:
+        return pd.DataFrame()
+    first_line = lines[0].strip()
+    if "|" in first_line:
+        headers = [header.strip() for header in first_line.split("|") if header.strip()]
+    else:
+        headers = ['Header1', 'Header2', 'Header3', 'Header4', 'Header5']
+    data = []
+    for line in lines[1:]:
+        if '---' in line:
+            continue
+        row = [cell.strip() for cell in line.split("|") if cell.strip()]
+        if len(row) == len(headers) and any(row):
+            data.append(row)
+        else:
+            logging.warning(f"Skipped malformed line: {line}")
+    df = pd.DataFrame(data)
+    if len(headers) != df.shape[1]:
+        headers = headers[:df.shape[1]]
+    df.columns = headers
+    return df
+
+
+def best_of(fn, arg, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(arg)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    logging.disable(logging.WARNING)  # The legacy loop logs every skipped line
+    print(f"{'rows':>8} {'legacy ms':>10} {'legacy rows':>12} {'split ms':>9} {'typed ms':>9} {'typed rows':>11} "
+          f"{'rows/s':>12}")
+    for size in SIZES:
+        response = synthetic_response(size)
+        legacy_s, legacy_df = best_of(legacy_extract_table, response)
+        split_s, _ = best_of(raw_tables, response)
+        parser_s, parser_df = best_of(parse_table, response)
+        print(f"{size:>8} {legacy_s * 1000:>10.1f} {len(legacy_df):>12} {split_s * 1000:>9.1f} "
+              f"{parser_s * 1000:>9.1f} {len(parser_df):>11} {size / parser_s:>12,.0f}")
+
+if __name__ == "__main__":
+    main()
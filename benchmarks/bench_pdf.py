@@ -0,0 +1,52 @@
+# PDF report rendering speed and peak memory.
+#
+#   python -m benchmarks.bench_pdf
+#
+# Renders single-table reports of growing size and a multi-patient batch report
+# (one section per patient) and prints rows per second.
+import time
+import random
+import tracemalloc
+from reports import build_pdf
+
+SIZES = [100, 1000, 5000]
+PATIENTS = 50
+ROWS_PER_PATIENT = 40
+HEADERS = ["Nom", "Paramètre", "Unité", "Résultat", "Valeur"]
+
+
+def synthetic_table(rows, patient="Patient", seed=0):
+    rng = random.Random(seed)
+    table = [HEADERS]
+    for i in range(rows):
+        note = " (contrôle à refaire, prélèvement hémolysé)" if i % 25 == 0 else ""  # Some cells wrap
+        table.append([patient, f"Paramètre {i % 40}", "g/L", f"{rng.uniform(0.1, 20):.2f}{note}", "0,7-1,1"])
+    return table
+
+
+def measure(sections):
+    tracemalloc.start()
+    started = time.perf_counter()
+    pdf = build_pdf(sections)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(pdf)
+
+
+def main():
+    print(f"{'report':<28} {'rows':>8} {'seconds':>8} {'rows/s':>10} {'peak MB':>8} {'PDF KB':>8}")
+    for size in SIZES:
+        elapsed, peak, pdf_bytes = measure([("Response:", synthetic_table(size))])
+        print(f"{'single table':<28} {size:>8} {elapsed:>8.2f} {size / elapsed:>10,.0f} "
+              f"{peak / 1024 ** 2:>8.1f} {pdf_bytes / 1024:>8.0f}")
+
+    sections = [(f"Patient {p}", synthetic_table(ROWS_PER_PATIENT, f"Patient {p}", seed=p)) for p in range(PATIENTS)]
+    rows = PATIENTS * ROWS_PER_PATIENT
+    elapsed, peak, pdf_bytes = measure(sections)
+    print(f"{f'batch ({PATIENTS} patients)':<28} {rows:>8} {elapsed:>8.2f} {rows / elapsed:>10,.0f} "
+          f"{peak / 1024 ** 2:>8.1f} {pdf_bytes / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Payload size and latency of the image pre-processing stage on the sample photos.
+#
+#   python -m benchmarks.bench_preprocess          # sizes and pre-processing time only
+#   python -m benchmarks.bench_preprocess --live   # also times real Gemini calls (needs GOOGLE_API_KEY)
+import sys
+import glob
+import time
+from io import BytesIO
+from PIL import Image
+from preprocess import preprocess_image
+
+SAMPLE_IMAGES = sorted(glob.glob("WhatsApp Image *.jpg"))
+
+SETTINGS = [
+    ("default", {}),
+    ("printed sheet", {"grayscale": True, "normalize_contrast": True}),
+    ("webp 1280", {"max_side": 1280, "fmt": "WEBP"}),
+]
+
+
+def sdk_payload_size(image):
+    # What the SDK would upload for an in-memory PIL image (lossless WebP)
+    buffer = BytesIO()
+    image.save(buffer, format="WEBP", lossless=True)
+    return buffer.tell()
+
+
+def time_call(model, contents):
+    started = time.perf_counter()
+    model.generate_content(contents)
+    return time.perf_counter() - started
+
+
+def main(live=False):
+    if not SAMPLE_IMAGES:
+        print("No sample images found, run from the repository root.")
+        return
+
+    model = None
+    if live:
+        import google.generativeai as genai
+        from utils import MODEL_NAME
+        model = genai.GenerativeModel(MODEL_NAME)
+
+    print(f"{'image':<40} {'setting':<14} {'raw KB':>8} {'sdk KB':>8} {'sent KB':>8} {'prep ms':>8} {'raw s':>7} {'sent s':>7}")
+    for path in SAMPLE_IMAGES:
+        with open(path, "rb") as f:
+            raw = f.read()
+        original = Image.open(BytesIO(raw))
+        original.load()
+        sdk_size = sdk_payload_size(original)
+
+        for label, options in SETTINGS:
+            started = time.perf_counter()
+            _, payload, report = preprocess_image(original, original_bytes=len(raw), **options)
+            prep_ms = (time.perf_counter() - started) * 1000
+
+            raw_s = sent_s = float("nan")
+            if model is not None:
+                raw_s = time_call(model, ["Extract the lab results table.", original])
+                sent_s = time_call(model, ["Extract the lab results table.", payload])
+
+            print(f"{path[-20:]:<40} {label:<14} {report['bytes_before'] / 1024:>8.0f} {sdk_size / 1024:>8.0f} "
+                  f"{report['bytes_after'] / 1024:>8.0f} {prep_ms:>8.1f} {raw_s:>7.2f} {sent_s:>7.2f}")
+
+
+if __name__ == "__main__":
+    main(live="--live" in sys.argv)
@@ -0,0 +1,54 @@
+# Dataset profiling speed and quantile sketch accuracy on the Data Analysis page.
+#
+#   python -m benchmarks.bench_profiling
+#
+# Profiles synthetic lab datasets with profiling.DatasetProfile (no sampling), compares
+# the sketch quantiles with exact ones, and times a cold and a warm sorted page of
+# tables.TableView, as the paged tables serve them.
+import time
+import numpy as np
+import pandas as pd
+from profiling import DatasetProfile, PROFILE_QUANTILES
+from tables import TableView, TABLE_PAGE_ROWS
+
+SIZES = [100000, 1000000, 5000000]
+
+
+def synthetic_dataset(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    result = rng.lognormal(mean=1.0, sigma=0.6, size=rows)
+    result[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame({
+        "Name": pd.Categorical(rng.integers(0, 5000, rows).astype(str)),
+        "Parameter": pd.Categorical(rng.choice(["Glucose", "Creatinine", "HDL", "LDL", "Hemoglobin"], rows)),
+        "Result Value": result,
+        "Age": rng.integers(1, 100, rows).astype("int16"),
+        "Date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365 * 24, rows), unit="h"),
+    })
+
+
+def main():
+    print(f"{'rows':>9} {'profile s':>10} {'max q err':>10} {'sort cold s':>12} {'sort warm ms':>13}")
+    for size in SIZES:
+        data = synthetic_dataset(size)
+        started = time.perf_counter()
+        profile = DatasetProfile(data, sample=False)
+        elapsed = time.perf_counter() - started
+
+        # Sketch error as a rank error: where the sketch answer falls among the exact values
+        values = np.sort(data["Result Value"].dropna().to_numpy())
+        errors = [abs(np.searchsorted(values, profile.summary.loc["Result Value", name]) / len(values) - fraction)
+                  for name, fraction in PROFILE_QUANTILES.items()]
+
+        view = TableView(data)
+        started = time.perf_counter()
+        view.rows(view.positions(sort_column="Result Value", descending=True), 0, TABLE_PAGE_ROWS)
+        cold = time.perf_counter() - started
+        started = time.perf_counter()
+        view.rows(view.positions(sort_column="Result Value", descending=True), TABLE_PAGE_ROWS, 2 * TABLE_PAGE_ROWS)
+        warm = time.perf_counter() - started
+        print(f"{size:>9} {elapsed:>10.2f} {max(errors):>10.4f} {cold:>12.2f} {warm * 1000:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
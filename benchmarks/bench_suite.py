@@ -0,0 +1,313 @@
+# Offline benchmark suite for the app's hot paths, written as JSON for comparison
+# between releases.
+#
+#   python -m benchmarks.bench_suite                                  # full suite
+#   python -m benchmarks.bench_suite --quick --output before.json
+#   python -m benchmarks.bench_suite --compare before.json            # exit 1 on regressions
+#   python -m benchmarks.bench_suite --latency 0.5 --quota-rate 0.1   # fake API behaviour
+#
+# Model calls go to the local fakes in benchmarks/fake_llm.py. Caches, the results store
+# and the rate limits are pointed at a scratch directory / lifted so runs are repeatable.
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import traceback
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+SCRATCH_DIR = tempfile.mkdtemp(prefix="doctolab-bench-")
+# Set before the app modules read them at import time
+os.environ.update({
+    "LLM_CACHE_DIR": os.path.join(SCRATCH_DIR, "llm_cache"),
+    "DATASET_CACHE_DIR": os.path.join(SCRATCH_DIR, "dataset_cache"),
+    "RESULTS_DB": os.path.join(SCRATCH_DIR, "lab_results.db"),
+    "METRICS_LOG": os.path.join(SCRATCH_DIR, "metrics.jsonl"),
+    "GEMINI_RPM": "1000000", "GEMINI_TPM": "1000000000",
+    "OPENAI_RPM": "1000000", "OPENAI_TPM": "1000000000",
+    "BACKOFF_BASE_SECONDS": "0.01", "BACKOFF_MAX_SECONDS": "0.1",
+    "OPENAI_MAX_RETRIES": "5",  # Same retry budget as the extractor runs below under --quota-rate
+})
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from PIL import Image  # noqa: E402
+import reports  # noqa: E402
+from batch import generate_batch  # noqa: E402
+from charts import build_figure  # noqa: E402
+from clients import openai_completion  # noqa: E402
+from chat_client import chat_client  # noqa: E402
+from dataset_cache import load_dataset  # noqa: E402
+from normalize import relabel_columns  # noqa: E402
+from preprocess import preprocess_image  # noqa: E402
+from ratelimit import call_with_backoff  # noqa: E402
+from utils import extract_table_from_response, generate_response_llm, load_prompt  # noqa: E402
+from benchmarks.bench_parser import synthetic_response  # noqa: E402
+from benchmarks.fake_llm import fake_apis, quota_error_types  # noqa: E402
+
+FULL = {
+    "images": [1, 4, 16],
+    "parse_rows": [100, 1000, 10000, 100000],
+    "pdf_rows": [100, 1000, 5000],
+    "csv_rows": [10000, 100000, 1000000],
+    "xlsx_rows": [1000, 10000, 50000],
+    "chart_rows": [10000, 200000, 1000000],
+    "repeat": 5,
+}
+QUICK = {
+    "images": [1, 4],
+    "parse_rows": [100, 10000],
+    "pdf_rows": [100, 1000],
+    "csv_rows": [10000, 100000],
+    "xlsx_rows": [1000],
+    "chart_rows": [10000, 200000],
+    "repeat": 3,
+}
+CHART_TYPES = [("Bar Chart", "Parameter", "Result"), ("Line Chart", "Date", "Result"),
+               ("Scatter Plot", "Result", "Value"), ("Histogram", "Result", None), ("Pie Chart", "Parameter", None)]
+CHAT_USERS = [1, 32]
+REGRESSION_THRESHOLD = 0.2  # Median slower by more than this share counts as a regression
+
+
+class Upload(BytesIO):
+    # Just enough of Streamlit's UploadedFile for dataset_cache
+    def __init__(self, data, name, file_id):
+        super().__init__(data)
+        self.name = name
+        self.file_id = file_id
+
+
+def measure(fn, repeat):
+    timings = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        fn(i)
+        timings.append(time.perf_counter() - started)
+    return {"min": min(timings), "median": statistics.median(timings), "mean": statistics.fmean(timings),
+            "runs": repeat}
+
+
+def synthetic_image(seed):
+    # Phone-photo sized noise: close to the real pre-processing cost, nothing to recognise
+    rng = np.random.default_rng(seed)
+    return Image.fromarray(rng.integers(0, 256, (3000, 4000, 3), dtype=np.uint8))
+
+
+def synthetic_dataset(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Name": [f"Patient {i}" for i in rng.integers(0, 5000, rows)],
+        "Date": pd.Timestamp("2020-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 4 * 365 * 24, rows)), unit="h"),
+        "Parameter": rng.choice(["Glycémie", "Créatinine", "Hémoglobine", "Cholestérol", "Potassium"], rows),
+        "Result": rng.normal(5, 2, rows).round(2),
+        "Value": rng.normal(50, 10, rows).round(1),
+    })
+
+
+def bench_extractor(sizes, repeat, results):
+    # The two stages are timed apart, as the app runs them: photos are pre-processed one by
+    # one when uploaded (then cached), and the batch of model calls runs concurrently on Send.
+    # Timing them together would hide the batch concurrency behind serial image work.
+    prompt = load_prompt()
+    photos = [synthetic_image(seed) for seed in range(max(sizes))]
+    payloads = [(f"image-{n}", preprocess_image(photo)[1]) for n, photo in enumerate(photos)]
+    for count in sizes:
+        def prepare(i):
+            for photo in photos[:count]:
+                preprocess_image(photo)
+        results.append({"benchmark": "extractor_preprocess", "case": f"{count} images", "params": {"images": count},
+                        "seconds": measure(prepare, repeat)})
+
+        def run(i):
+            # (Fake) model calls with retries, parsing and normalization. A new question every
+            # run, so the response cache never answers.
+            for name, response, error in generate_batch(payloads[:count], call_with_backoff, fn=generate_response_llm,
+                                                        retry_on=quota_error_types(), max_retries=5,
+                                                        input_question=f"Extract the table (run {count}-{i})",
+                                                        prompt=prompt):
+                if error is None:
+                    relabel_columns(extract_table_from_response(response))
+        results.append({"benchmark": "extractor_batch", "case": f"{count} images", "params": {"images": count},
+                        "seconds": measure(run, repeat)})
+
+
+def bench_parse(sizes, repeat, results):
+    for rows in sizes:
+        response = synthetic_response(rows)
+        results.append({"benchmark": "extract_table_from_response", "case": f"{rows} rows", "params": {"rows": rows},
+                        "seconds": measure(lambda i: extract_table_from_response(response), repeat)})
+
+
+def bench_pdf(sizes, repeat, results):
+    for rows in sizes:
+        response = synthetic_response(rows)
+
+        def cold(i):
+            reports._cache.clear()
+            reports.response_report([("Response:", response)])
+        results.append({"benchmark": "create_pdf", "case": f"{rows} rows", "params": {"rows": rows, "cache": "cold"},
+                        "seconds": measure(cold, repeat)})
+        results.append({"benchmark": "create_pdf", "case": f"{rows} rows cached",
+                        "params": {"rows": rows, "cache": "warm"},
+                        "seconds": measure(lambda i: reports.response_report([("Response:", response)]), repeat)})
+
+
+def _encode(data, extension):
+    buffer = BytesIO()
+    if extension == "csv":
+        data.to_csv(buffer, index=False)
+    else:
+        data.to_excel(buffer, index=False)
+    return buffer.getvalue()
+
+
+def bench_load_data(csv_sizes, xlsx_sizes, repeat, results):
+    for extension, sizes in (("csv", csv_sizes), ("xlsx", xlsx_sizes)):
+        runs = repeat if extension == "csv" else 1  # Writing large workbooks is slow
+        for rows in sizes:
+            # Different content every run, so neither the memory nor the Parquet cache answers
+            contents = [_encode(synthetic_dataset(rows, seed=rows + i), extension) for i in range(runs)]
+            seconds = measure(lambda i: load_dataset(Upload(contents[i], f"data.{extension}",
+                                                            f"cold-{extension}-{rows}-{i}")), runs)
+            results.append({"benchmark": "load_data", "case": f"{extension} {rows} rows",
+                            "params": {"format": extension, "rows": rows, "bytes": len(contents[0]), "cache": "cold"},
+                            "seconds": seconds})
+            warm = Upload(contents[0], f"data.{extension}", f"warm-{extension}-{rows}")
+            load_dataset(warm)
+            results.append({"benchmark": "load_data", "case": f"{extension} {rows} rows cached",
+                            "params": {"format": extension, "rows": rows, "cache": "warm"},
+                            "seconds": measure(lambda i: load_dataset(warm), repeat)})
+
+
+def bench_charts(sizes, repeat, results):
+    for rows in sizes:
+        data = synthetic_dataset(rows)
+        for chart_type, x_column, y_column in CHART_TYPES:
+            results.append({"benchmark": "build_figure", "case": f"{chart_type} {rows} rows",
+                            "params": {"chart": chart_type, "rows": rows},
+                            "seconds": measure(lambda i: build_figure(data, chart_type, x_column, y_column), repeat)})
+
+
+def bench_chat(repeat, results):
+    results.append({"benchmark": "openai_completion", "case": "single prompt", "params": {},
+                    "seconds": measure(lambda i: openai_completion(f"Summarise result {i}"), repeat)})
+
+    # Many sessions asking the same question at once: one upstream call, shared by all
+    for users in CHAT_USERS:
+        def run(i):
+            with ThreadPoolExecutor(max_workers=users) as pool:
+                list(pool.map(lambda _: chat_client.complete(f"Explain result {users}-{i}"), range(users)))
+        results.append({"benchmark": "chat_client", "case": f"{users} identical prompts", "params": {"users": users},
+                        "seconds": measure(run, repeat)})
+
+
+def metadata(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "fake_api": {"latency": args.latency, "jitter": args.jitter, "error_rate": args.error_rate,
+                     "quota_rate": args.quota_rate},
+        "quick": args.quick,
+    }
+
+
+def compare(results, baseline_path):
+    # Cases whose median got slower than the baseline by more than REGRESSION_THRESHOLD
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["benchmark"], r["case"]): r for r in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        before = baseline.get((result["benchmark"], result["case"]))
+        if before is None:
+            continue
+        ratio = result["seconds"]["median"] / max(before["seconds"]["median"], 1e-9)
+        result["baseline_ratio"] = ratio
+        if ratio > 1 + REGRESSION_THRESHOLD:
+            regressions.append(result)
+    return regressions
+
+
+def write_results(path, meta, results, failures):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results, "failures": failures}, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite (fake Gemini/OpenAI).")
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and fewer repetitions")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="earlier results file to check for regressions")
+    parser.add_argument("--only", nargs="+", help="benchmarks to run",
+                        choices=["extractor", "parse", "pdf", "load_data", "charts", "chat"])
+    parser.add_argument("--latency", type=float, default=0.2, help="fake API latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls failing with a server error")
+    parser.add_argument("--quota-rate", type=float, default=0.0, help="share of calls failing with a quota error")
+    args = parser.parse_args()
+
+    sizes = QUICK if args.quick else FULL
+    repeat = sizes["repeat"]
+    selected = set(args.only or ["extractor", "parse", "pdf", "load_data", "charts", "chat"])
+    results = []
+    failures = []
+    benchmarks = [
+        ("extractor", lambda: bench_extractor(sizes["images"], repeat, results)),
+        ("parse", lambda: bench_parse(sizes["parse_rows"], repeat, results)),
+        ("pdf", lambda: bench_pdf(sizes["pdf_rows"], repeat, results)),
+        ("load_data", lambda: bench_load_data(sizes["csv_rows"], sizes["xlsx_rows"], repeat, results)),
+        ("charts", lambda: bench_charts(sizes["chart_rows"], repeat, results)),
+        ("chat", lambda: bench_chat(repeat, results)),
+    ]
+    meta = metadata(args)
+    random.seed(0)
+    with fake_apis(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                   quota_rate=args.quota_rate) as backend:
+        for name, run in benchmarks:
+            if name not in selected:
+                continue
+            try:
+                run()
+            except Exception as e:
+                # One failing benchmark (e.g. retries used up under --error-rate) doesn't end the run
+                traceback.print_exc()
+                failures.append({"benchmark": name, "error": f"{type(e).__name__}: {e}"})
+            # Written after every benchmark, so an interrupted run keeps what already finished
+            write_results(args.output, dict(meta, fake_api_calls=backend.stats()), results, failures)
+
+    regressions = compare(results, args.compare) if args.compare else []
+    print(f"{'benchmark':<30} {'case':<32} {'median ms':>10} {'min ms':>10} {'vs base':>8}")
+    for result in results:
+        ratio = result.get("baseline_ratio")
+        print(f"{result['benchmark']:<30} {result['case']:<32} {result['seconds']['median'] * 1000:>10.1f} "
+              f"{result['seconds']['min'] * 1000:>10.1f} {f'{ratio:.2f}x' if ratio else '':>8}")
+
+    if args.compare:
+        # compare() added the baseline ratios to the results
+        write_results(args.output, dict(meta, fake_api_calls=backend.stats()), results, failures)
+    print(f"Results written to {args.output}")
+    for failure in failures:
+        print(f"{failure['benchmark']} failed: {failure['error']}")
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {REGRESSION_THRESHOLD:.0%}:")
+        for result in regressions:
+            print(f"  {result['benchmark']} / {result['case']}: {result['baseline_ratio']:.2f}x")
+    if regressions or failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
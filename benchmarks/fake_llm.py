@@ -0,0 +1,165 @@
+# Local stand-ins for the Gemini and OpenAI APIs, so benchmarks run with no network.
+#
+#   with fake_apis(latency=0.2, quota_rate=0.05):
+#       ...  # clients.generate_content / openai_completion now hit the fakes
+#
+# The fakes sit behind clients.py, so the rate limiter, retries, response cache and
+# stats all run as they do against the real services.
+import time
+import random
+import asyncio
+import threading
+from types import SimpleNamespace
+from contextlib import contextmanager
+import clients
+from benchmarks.bench_parser import synthetic_response
+
+
+class FakeQuotaError(Exception):
+    # Used when google-api-core / openai are not installed
+    retry_after = None
+
+
+class FakeServerError(Exception):
+    pass
+
+
+def quota_error(provider):
+    # The quota exception the app retries on for this provider, with a retry hint
+    message = "Quota exceeded (fake), retry in 0.01s"
+    try:
+        if provider == "gemini":
+            from google.api_core.exceptions import ResourceExhausted
+            return ResourceExhausted(message)
+        from openai.error import RateLimitError
+        return RateLimitError(message)
+    except ImportError:
+        return FakeQuotaError(message)
+
+
+def quota_error_types():
+    types = [FakeQuotaError]
+    try:
+        from google.api_core.exceptions import ResourceExhausted
+        types.append(ResourceExhausted)
+    except ImportError:
+        pass
+    try:
+        from openai.error import RateLimitError
+        types.append(RateLimitError)
+    except ImportError:
+        pass
+    return tuple(types)
+
+
+class FakeBackend:
+    # Latency, failures and canned answers shared by the fake models
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, quota_rate=0.0, rows=40, chunks=8, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota_rate = quota_rate
+        self.rows = rows
+        self.chunks = chunks
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.quota_errors = 0
+
+    def _draw(self):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            roll = self._rng.random()
+            seed = self._rng.randrange(1 << 30)
+        return delay, roll, seed
+
+    def respond(self, provider):
+        # Sleeps like a remote call, then raises or returns a markdown table answer
+        delay, roll, seed = self._draw()
+        time.sleep(delay)
+        return self._outcome(provider, roll, seed)
+
+    async def respond_async(self, provider):
+        delay, roll, seed = self._draw()
+        await asyncio.sleep(delay)
+        return self._outcome(provider, roll, seed)
+
+    def _outcome(self, provider, roll, seed):
+        if roll < self.quota_rate:
+            with self._lock:
+                self.quota_errors += 1
+            raise quota_error(provider)
+        if roll < self.quota_rate + self.error_rate:
+            with self._lock:
+                self.errors += 1
+            raise FakeServerError("Internal error (fake)")
+        return synthetic_response(self.rows, seed=seed)
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "errors": self.errors, "quota_errors": self.quota_errors}
+
+
+def _split(text, parts):
+    size = max(1, len(text) // parts)
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class FakeGeminiModel:
+    # Mirrors the genai.GenerativeModel calls clients.py makes
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def generate_content(self, contents, stream=False, request_options=None):
+        text = self.backend.respond("gemini")
+        if stream:
+            return iter([SimpleNamespace(text=chunk) for chunk in _split(text, self.backend.chunks)])
+        return SimpleNamespace(text=text)
+
+    async def generate_content_async(self, contents, stream=False, request_options=None):
+        text = await self.backend.respond_async("gemini")
+        return SimpleNamespace(text=text)
+
+
+class FakeCompletion:
+    # Mirrors openai.Completion (openai<1.0)
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def _response(self, text):
+        return SimpleNamespace(choices=[SimpleNamespace(text=text)])
+
+    def create(self, engine=None, prompt=None, max_tokens=None, request_timeout=None):
+        return self._response(self.backend.respond("openai"))
+
+    async def acreate(self, engine=None, prompt=None, max_tokens=None, request_timeout=None, stream=False):
+        text = await self.backend.respond_async("openai")
+        if not stream:
+            return self._response(text)
+
+        async def chunks():
+            for chunk in _split(text, self.backend.chunks):
+                yield self._response(chunk)
+        return chunks()
+
+
+@contextmanager
+def fake_apis(**settings):
+    # Swaps the model and OpenAI handles in clients.py for the fakes, yields the backend. The
+    # fake quota errors count as retryable, so OpenAI backoff runs as it would on a 429.
+    backend = FakeBackend(**settings)
+    model = FakeGeminiModel(backend)
+    fake_openai = SimpleNamespace(Completion=FakeCompletion(backend))
+    saved = clients.get_gemini_model, clients._get_openai, clients._openai_retryable
+    clients.get_gemini_model = lambda model_name=None: model
+    clients._get_openai = lambda: fake_openai
+    clients._openai_retryable = quota_error_types
+    try:
+        yield backend
+    finally:
+        clients.get_gemini_model, clients._get_openai, clients._openai_retryable = saved
@@ -0,0 +1,80 @@
+# Fuzz the markdown table parser with the malformed outputs in fuzz_corpus/ and random
+# mutations of them.
+#
+#   python -m benchmarks.fuzz_parser [iterations]
+#
+# Checks that parsing never raises, that every row has its header's width, and that
+# the streaming parser emits the same rows as the blocking one whatever the chunking.
+import os
+import sys
+import random
+from table_parser import StreamingTableParser, raw_tables, parse_tables
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "fuzz_corpus")
+ALPHABET = ["|", "-", ":", " ", "\n", "\r\n", "a", "1", ",", ".", "<", "é", "\t"]
+
+
+def load_corpus():
+    corpus = {}
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        with open(os.path.join(CORPUS_DIR, name), "r", encoding="utf-8", newline="") as f:
+            corpus[name] = f.read()
+    return corpus
+
+
+def mutate(text, rng):
+    chars = list(text)
+    for _ in range(rng.randint(1, 8)):
+        position = rng.randint(0, len(chars))
+        action = rng.random()
+        if action < 0.4 or not chars:
+            chars.insert(position, rng.choice(ALPHABET))
+        elif action < 0.7:
+            del chars[min(position, len(chars) - 1)]
+        else:
+            chars[min(position, len(chars) - 1)] = rng.choice(ALPHABET)
+    return "".join(chars)
+
+
+def streamed_rows(text, rng):
+    parser = StreamingTableParser()
+    rows = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 40)
+        rows.extend(parser.feed(text[position:position + size]))
+        position += size
+    rows.extend(parser.close())
+    return rows
+
+
+def check(name, text, rng):
+    tables = raw_tables(text)
+    for table in tables:
+        width = len(table[0])
+        assert all(len(row) == width for row in table[1:]), f"{name}: ragged row survived"
+    expected = [row for table in tables for row in table[1:]]
+    assert streamed_rows(text, rng) == expected, f"{name}: streaming and blocking rows differ"
+    frames = parse_tables(text)
+    assert sum(len(df) for df in frames) == len(expected), f"{name}: DataFrames lost rows"
+
+
+def main(iterations=2000, seed=0):
+    rng = random.Random(seed)
+    corpus = load_corpus()
+    for name, text in corpus.items():
+        check(name, text, rng)
+    names = list(corpus)
+    for i in range(iterations):
+        name = rng.choice(names)
+        text = mutate(corpus[name], rng)
+        try:
+            check(f"{name} (mutation {i})", text, rng)
+        except Exception:
+            print(f"Failing input from {name}, mutation {i}:\n{text!r}")
+            raise
+    print(f"OK: {len(corpus)} corpus files and {iterations} mutations parsed")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,161 @@
+import os
+import numpy as np
+import pandas as pd
+import plotly.express as px
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Large-data thresholds (can be overridden from .env)
+LARGE_DATA_ROWS = int(os.getenv("LARGE_DATA_ROWS", "100000"))
+LINE_MAX_POINTS = int(os.getenv("LINE_MAX_POINTS", "5000"))
+SCATTER_WEBGL_ROWS = int(os.getenv("SCATTER_WEBGL_ROWS", "10000"))
+SCATTER_DENSITY_ROWS = int(os.getenv("SCATTER_DENSITY_ROWS", "300000"))
+DENSITY_BINS = int(os.getenv("DENSITY_BINS", "200"))
+HISTOGRAM_BINS = int(os.getenv("HISTOGRAM_BINS", "100"))
+
+
+def _as_float(values):
+    # Numeric or datetime values as float64, None when the column can't be ordered numerically
+    if pd.api.types.is_datetime64_any_dtype(values):
+        stamps = values.to_numpy(dtype="datetime64[ns]")
+        as_float = stamps.astype("int64").astype("float64")
+        as_float[np.isnat(stamps)] = np.nan
+        return as_float
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype="float64", na_value=np.nan)
+    return None
+
+
+def lttb(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: indices of the points that keep the visual shape of the line
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out - 2 buckets between the end points
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        if end <= start or next_end <= end:  # Empty bucket when points are scarce
+            selected[i + 1] = previous
+            continue
+        # Average of the next bucket is the third corner of the triangle
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        bucket_x, bucket_y = x[start:end], y[start:end]
+        areas = np.abs((x[previous] - avg_x) * (bucket_y - y[previous])
+                       - (x[previous] - bucket_x) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return np.unique(selected)
+
+
+def _line(data, x_column, y_column, notes):
+    title = f"Line Chart: {y_column} vs {x_column}"
+    if len(data) <= LARGE_DATA_ROWS:
+        return px.line(data, x=x_column, y=y_column, title=title, width=800, height=600)
+
+    y = _as_float(data[y_column])
+    if y is None:
+        # Non-numeric values can't be ranked by area: keep an even stride instead
+        positions = np.linspace(0, len(data) - 1, LINE_MAX_POINTS).astype(np.int64)
+        notes.append(f"Line reduced from {len(data):,} to {len(positions):,} evenly spaced points.")
+    else:
+        x = _as_float(data[x_column])
+        x = np.arange(len(data), dtype="float64") if x is None else x
+        valid = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+        positions = valid[lttb(x[valid], y[valid], LINE_MAX_POINTS)]
+        notes.append(f"Line downsampled with LTTB from {len(data):,} to {len(positions):,} points.")
+    return px.line(data.iloc[positions], x=x_column, y=y_column, title=title, width=800, height=600)
+
+
+def _scatter(data, x_column, y_column, notes):
+    title = f"Scatter Plot: {y_column} vs {x_column}"
+    if len(data) <= SCATTER_WEBGL_ROWS:
+        return px.scatter(data, x=x_column, y=y_column, title=title, width=800, height=600)
+    if len(data) <= SCATTER_DENSITY_ROWS:
+        notes.append(f"Scatter drawn with WebGL ({len(data):,} points).")
+        return px.scatter(data, x=x_column, y=y_column, title=title, width=800, height=600,
+                          render_mode="webgl")
+
+    # Too many points for the browser: bin them on the server and send a density image
+    x = _as_float(data[x_column])
+    y = _as_float(data[y_column])
+    valid = ~(np.isnan(x) | np.isnan(y))
+    counts, x_edges, y_edges = np.histogram2d(x[valid], y[valid], bins=DENSITY_BINS)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    notes.append(f"Scatter of {int(valid.sum()):,} points shown as a {DENSITY_BINS}x{DENSITY_BINS} density image.")
+    fig = px.imshow(np.log1p(counts.T), x=x_centers, y=y_centers, origin="lower", aspect="auto",
+                    labels={"x": x_column, "y": y_column, "color": "log(1 + count)"},
+                    title=title, width=800, height=600, color_continuous_scale="Viridis")
+    return fig
+
+
+def _bar(data, x_column, y_column, notes):
+    title = f"Bar Chart: {y_column} vs {x_column}"
+    if len(data) <= LARGE_DATA_ROWS:
+        return px.bar(data, x=x_column, y=y_column, title=title)
+    # Plotly stacks one bar segment per row; summing per category draws the same bar heights
+    if x_column == y_column:
+        aggregated = data[x_column].value_counts(sort=False).rename_axis(x_column).reset_index(name="count")
+        notes.append(f"Bars pre-counted from {len(data):,} rows to {len(aggregated):,}.")
+        return px.bar(aggregated, x=x_column, y="count", title=title)
+    grouped = data.groupby(x_column, observed=True, sort=True)[y_column]
+    if pd.api.types.is_numeric_dtype(data[y_column]):
+        aggregated = grouped.sum().reset_index()
+        notes.append(f"Bars pre-aggregated (sum of {y_column}) from {len(data):,} rows to {len(aggregated):,}.")
+    else:
+        aggregated = grouped.count().reset_index()
+        notes.append(f"Bars pre-aggregated (count of {y_column}) from {len(data):,} rows to {len(aggregated):,}.")
+    return px.bar(aggregated, x=x_column, y=y_column, title=title)
+
+
+def _histogram(data, x_column, notes):
+    title = f"Histogram: {x_column}"
+    if len(data) <= LARGE_DATA_ROWS:
+        return px.histogram(data, x=x_column, title=title)
+    values = _as_float(data[x_column])
+    if values is None:
+        counts = data[x_column].value_counts(sort=False)
+        notes.append(f"Histogram pre-counted over {len(counts):,} categories.")
+        return px.bar(x=counts.index, y=counts.to_numpy(), labels={"x": x_column, "y": "count"}, title=title)
+    values = values[~np.isnan(values)]
+    counts, edges = np.histogram(values, bins=HISTOGRAM_BINS)
+    centers = (edges[:-1] + edges[1:]) / 2
+    if pd.api.types.is_datetime64_any_dtype(data[x_column]):
+        centers = pd.to_datetime(centers.astype("int64"))
+    notes.append(f"Histogram pre-binned into {HISTOGRAM_BINS} bins from {len(values):,} values.")
+    fig = px.bar(x=centers, y=counts, labels={"x": x_column, "y": "count"}, title=title)
+    fig.update_layout(bargap=0)
+    return fig
+
+
+def _pie(data, x_column, notes):
+    title = f"Pie Chart: {x_column}"
+    if len(data) <= LARGE_DATA_ROWS:
+        return px.pie(data, names=x_column, title=title)
+    counts = data[x_column].value_counts()
+    notes.append(f"Pie slices pre-counted from {len(data):,} rows to {len(counts):,} categories.")
+    return px.pie(names=counts.index, values=counts.to_numpy(), title=title)
+
+
+def build_figure(data, chart_type, x_column, y_column=None):
+    # Returns the figure and the list of reductions applied for large datasets
+    notes = []
+    if chart_type == "Bar Chart":
+        fig = _bar(data, x_column, y_column, notes)
+    elif chart_type == "Line Chart":
+        fig = _line(data, x_column, y_column, notes)
+    elif chart_type == "Scatter Plot":
+        fig = _scatter(data, x_column, y_column, notes)
+    elif chart_type == "Histogram":
+        fig = _histogram(data, x_column, notes)
+    elif chart_type == "Pie Chart":
+        fig = _pie(data, x_column, notes)
+    else:
+        fig = None
+    return fig, notes
@@ -1,16 +1,5 @@
-from dotenv import load_dotenv
-import openai
-import os
-
-load_dotenv()  # Load environment variables from .env
-
-# Configure OpenAI API key
-openai.api_key = os.getenv("OPENAI_API_KEY")
+from chat_client import chat_client
 
 def chat_with_openai(prompt):
-    response = openai.Completion.create(
-        engine="text-davinci-003",
-        prompt=prompt,
-        max_tokens=150
-    )
-    return response.choices[0].text.strip()
+    # Pooling, coalescing of identical prompts and the short-lived cache live in chat_client.py
+    return chat_client.complete(prompt, max_tokens=150)
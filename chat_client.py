@@ -0,0 +1,171 @@
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from clients import openai_completion_stream_async
+
+load_dotenv()
+
+# Chat cache settings (can be overridden from .env)
+CHAT_CACHE_ENTRIES = int(os.getenv("CHAT_CACHE_ENTRIES", "256"))
+CHAT_CACHE_TTL_SECONDS = float(os.getenv("CHAT_CACHE_TTL_SECONDS", "300"))
+CHAT_TIMEOUT = float(os.getenv("CHAT_TIMEOUT", "120"))
+
+_DONE = object()  # End of stream marker for the thread-side queue
+
+
+class _Broadcast:
+    # One upstream completion shared by every caller asking the same thing meanwhile.
+    # Chunks are kept, so a caller joining late replays them before following live ones.
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self._changed = asyncio.Event()
+
+    def push(self, chunk):
+        self.chunks.append(chunk)
+        self._changed.set()
+
+    def finish(self, error=None):
+        self.done = True
+        self.error = error
+        self._changed.set()
+
+    async def follow(self):
+        position = 0
+        while True:
+            if position < len(self.chunks):
+                position += 1
+                yield self.chunks[position - 1]
+            elif self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            else:
+                self._changed.clear()
+                await self._changed.wait()
+
+
+class ChatClient:
+    # Async chat completions on one background event loop, so every Streamlit session and
+    # thread shares the connection pool, the in-flight requests and the cache. Only the
+    # loop thread touches _cache and _in_flight, so they need no lock.
+
+    def __init__(self, cache_entries=CHAT_CACHE_ENTRIES, ttl=CHAT_CACHE_TTL_SECONDS):
+        self.cache_entries = cache_entries
+        self.ttl = ttl
+        self._cache = OrderedDict()  # key -> (expires at, text)
+        self._in_flight = {}  # key -> _Broadcast
+        self._loop = None
+        self._start_lock = threading.Lock()
+        self._stats = {"requests": 0, "cache_hits": 0, "coalesced": 0, "upstream": 0, "retries": 0, "errors": 0}
+
+    def _get_loop(self):
+        if self._loop is None:
+            with self._start_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="chat-loop", daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def _cached(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires, text = entry
+        if expires < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return text
+
+    def _on_retry(self, attempt, delay, e):
+        self._stats["retries"] += 1
+        logging.warning(f"Chat completion throttled, retrying in {delay:.1f}s ({attempt + 1}): {e}")
+
+    async def _upstream(self, key, broadcast, prompt, max_tokens, engine):
+        # Quota errors while opening the stream are retried with backoff before anything is
+        # broadcast, so the callers waiting on this answer just wait longer instead of failing
+        self._stats["upstream"] += 1
+        try:
+            async for chunk in openai_completion_stream_async(prompt, max_tokens=max_tokens, engine=engine,
+                                                              on_retry=self._on_retry):
+                broadcast.push(chunk)
+        except Exception as e:
+            self._stats["errors"] += 1
+            logging.error(f"Chat completion failed: {e}")
+            broadcast.finish(e)
+        else:
+            broadcast.finish()
+            self._cache[key] = (time.monotonic() + self.ttl, "".join(broadcast.chunks).strip())
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def _stream(self, prompt, max_tokens, engine):
+        # Runs on the background loop: cache, then an identical request in flight, then upstream
+        self._stats["requests"] += 1
+        key = (engine, max_tokens, prompt)
+        text = self._cached(key)
+        if text is not None:
+            self._stats["cache_hits"] += 1
+            yield text
+            return
+        broadcast = self._in_flight.get(key)
+        if broadcast is not None:
+            self._stats["coalesced"] += 1
+        else:
+            broadcast = _Broadcast()
+            self._in_flight[key] = broadcast
+            # Its own task: a caller giving up does not cancel the answer the others wait for
+            asyncio.get_running_loop().create_task(self._upstream(key, broadcast, prompt, max_tokens, engine))
+        async for chunk in broadcast.follow():
+            yield chunk
+
+    async def _complete(self, prompt, max_tokens, engine):
+        chunks = [chunk async for chunk in self._stream(prompt, max_tokens, engine)]
+        return "".join(chunks).strip()
+
+    async def complete_async(self, prompt, max_tokens=150, engine=None):
+        # Awaitable from any event loop
+        future = asyncio.run_coroutine_threadsafe(self._complete(prompt, max_tokens, engine), self._get_loop())
+        return await asyncio.wrap_future(future)
+
+    def complete(self, prompt, max_tokens=150, engine=None, timeout=CHAT_TIMEOUT):
+        future = asyncio.run_coroutine_threadsafe(self._complete(prompt, max_tokens, engine), self._get_loop())
+        return future.result(timeout)
+
+    def stream(self, prompt, max_tokens=150, engine=None, timeout=CHAT_TIMEOUT):
+        # Blocking generator of text chunks, e.g. for st.write_stream
+        chunks = queue.Queue()
+
+        async def pump():
+            try:
+                async for chunk in self._stream(prompt, max_tokens, engine):
+                    chunks.put(chunk)
+                chunks.put(_DONE)
+            except Exception as e:
+                chunks.put(e)
+
+        asyncio.run_coroutine_threadsafe(pump(), self._get_loop())
+        while True:
+            item = chunks.get(timeout=timeout)
+            if item is _DONE:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def stats(self):
+        return dict(self._stats, cache_entries=len(self._cache), in_flight=len(self._in_flight))
+
+
+chat_client = ChatClient()
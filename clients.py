@@ -0,0 +1,207 @@
+import os
+import time
+import asyncio
+import threading
+import weakref
+from dotenv import load_dotenv
+from ratelimit import gemini_limiter, openai_limiter, estimate_tokens, call_with_backoff, call_with_backoff_async
+
+load_dotenv()
+
+# Model and transport settings (can be overridden from .env)
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-pro-latest")
+GEMINI_VISION_MODEL = os.getenv("GEMINI_VISION_MODEL", "gemini-1.5-flash")
+GEMINI_TRANSPORT = os.getenv("GEMINI_TRANSPORT")  # "grpc" (SDK default), "grpc_asyncio" or "rest"
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "120"))
+GEMINI_OUTPUT_TOKENS = 1000  # Budgeting guess for the rate limiter
+
+OPENAI_ENGINE = os.getenv("OPENAI_ENGINE", "text-davinci-003")
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "16"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+
+_lock = threading.Lock()
+_gemini_configured = False
+_openai_configured = False
+_models = {}  # model name -> GenerativeModel, created once per process
+_aiosessions = weakref.WeakKeyDictionary()  # event loop -> pooled aiohttp session for openai
+_stats = {}  # operation -> {"calls", "errors", "seconds"}
+
+
+def _record(operation, started, failed):
+    elapsed = time.perf_counter() - started
+    with _lock:
+        entry = _stats.setdefault(operation, {"calls": 0, "errors": 0, "seconds": 0.0})
+        entry["calls"] += 1
+        entry["errors"] += int(failed)
+        entry["seconds"] += elapsed
+
+
+def client_stats():
+    with _lock:
+        return {
+            operation: dict(entry, mean_seconds=entry["seconds"] / entry["calls"] if entry["calls"] else 0.0)
+            for operation, entry in _stats.items()
+        }
+
+
+def get_gemini_model(model_name=None):
+    global _gemini_configured
+    model_name = model_name or GEMINI_MODEL
+    model = _models.get(model_name)
+    if model is not None:
+        return model
+    with _lock:
+        import google.generativeai as genai
+        if not _gemini_configured:
+            options = {"api_key": os.getenv("GOOGLE_API_KEY")}
+            if GEMINI_TRANSPORT:
+                options["transport"] = GEMINI_TRANSPORT
+            genai.configure(**options)
+            _gemini_configured = True
+        if model_name not in _models:
+            _models[model_name] = genai.GenerativeModel(model_name)
+        return _models[model_name]
+
+
+def _gemini_tokens(contents):
+    parts = contents if isinstance(contents, list) else [contents]
+    return estimate_tokens(*parts, output_tokens=GEMINI_OUTPUT_TOKENS)
+
+
+def generate_content(contents, model_name=None, stream=False):
+    # Blocking call; with stream=True returns the SDK's chunk iterator
+    model = get_gemini_model(model_name)
+    gemini_limiter.acquire(_gemini_tokens(contents))
+    started = time.perf_counter()
+    failed = True
+    try:
+        response = model.generate_content(contents, stream=stream,
+                                          request_options={"timeout": GEMINI_TIMEOUT})
+        failed = False
+        return response
+    finally:
+        _record("gemini.stream" if stream else "gemini.generate", started, failed)
+
+
+async def generate_content_async(contents, model_name=None, stream=False):
+    model = get_gemini_model(model_name)
+    await asyncio.to_thread(gemini_limiter.acquire, _gemini_tokens(contents))
+    started = time.perf_counter()
+    failed = True
+    try:
+        response = await model.generate_content_async(contents, stream=stream,
+                                                      request_options={"timeout": GEMINI_TIMEOUT})
+        failed = False
+        return response
+    finally:
+        _record("gemini.stream_async" if stream else "gemini.generate_async", started, failed)
+
+
+def _get_openai():
+    global _openai_configured
+    import openai
+    if _openai_configured:
+        return openai
+    with _lock:
+        if not _openai_configured:
+            import requests
+            openai.api_key = os.getenv("OPENAI_API_KEY")
+            # One pooled keep-alive session for every thread instead of one per thread
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=OPENAI_POOL_SIZE,
+                                                    pool_maxsize=OPENAI_POOL_SIZE)
+            session.mount("https://", adapter)
+            openai.requestssession = session
+            _openai_configured = True
+    return openai
+
+
+def _use_async_pool(openai):
+    # openai<1.0 opens a new aiohttp session per async call unless one is set for the context:
+    # share one pooled session per event loop instead
+    if not hasattr(openai, "aiosession"):
+        return
+    loop = asyncio.get_running_loop()
+    session = _aiosessions.get(loop)
+    if session is None or session.closed:
+        import aiohttp
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=OPENAI_POOL_SIZE))
+        _aiosessions[loop] = session
+    openai.aiosession.set(session)
+
+
+def _openai_retryable():
+    # Errors worth another try after a backoff: rate limits and an overloaded service
+    from openai.error import RateLimitError, ServiceUnavailableError
+    return (RateLimitError, ServiceUnavailableError)
+
+
+def _openai_backoff():
+    # Every attempt takes its own limiter token, so retries are budgeted like first calls
+    return {"retry_on": _openai_retryable(), "max_retries": OPENAI_MAX_RETRIES, "limiter": openai_limiter}
+
+
+def _openai_completion_once(prompt, max_tokens, engine):
+    openai = _get_openai()
+    openai_limiter.acquire(estimate_tokens(prompt, output_tokens=max_tokens))
+    started = time.perf_counter()
+    failed = True
+    try:
+        response = openai.Completion.create(
+            engine=engine or OPENAI_ENGINE,
+            prompt=prompt,
+            max_tokens=max_tokens,
+            request_timeout=OPENAI_TIMEOUT
+        )
+        failed = False
+        return response.choices[0].text.strip()
+    finally:
+        _record("openai.completion", started, failed)
+
+
+def openai_completion(prompt, max_tokens=150, engine=None):
+    return call_with_backoff(_openai_completion_once, prompt, max_tokens, engine, **_openai_backoff())
+
+
+async def _openai_completion_async_once(prompt, max_tokens, engine, stream=False):
+    openai = _get_openai()
+    _use_async_pool(openai)
+    await asyncio.to_thread(openai_limiter.acquire, estimate_tokens(prompt, output_tokens=max_tokens))
+    started = time.perf_counter()
+    failed = True
+    try:
+        response = await openai.Completion.acreate(
+            engine=engine or OPENAI_ENGINE,
+            prompt=prompt,
+            max_tokens=max_tokens,
+            request_timeout=OPENAI_TIMEOUT,
+            stream=stream
+        )
+        failed = False
+        return response
+    finally:
+        _record("openai.open_stream_async" if stream else "openai.completion_async", started, failed)
+
+
+async def openai_completion_async(prompt, max_tokens=150, engine=None):
+    response = await call_with_backoff_async(_openai_completion_async_once, prompt, max_tokens, engine,
+                                             **_openai_backoff())
+    return response.choices[0].text.strip()
+
+
+async def openai_completion_stream_async(prompt, max_tokens=150, engine=None, on_retry=None):
+    # Async generator of text chunks as the completion is produced. Retries only cover opening
+    # the stream: once chunks went out we don't start over.
+    response = await call_with_backoff_async(_openai_completion_async_once, prompt, max_tokens, engine,
+                                             stream=True, on_retry=on_retry, **_openai_backoff())
+    started = time.perf_counter()
+    failed = True
+    try:
+        async for chunk in response:
+            text = chunk.choices[0].text
+            if text:
+                yield text
+        failed = False
+    finally:
+        _record("openai.stream_async", started, failed)
@@ -1,5 +1,18 @@
+import hashlib
 import streamlit as st
 import pandas as pd
+from tables import show_table
+
+# Metrics page time windows: label -> (look-back, chart bucket)
+METRICS_WINDOWS = {
+    "Last hour": (pd.Timedelta(hours=1), "1min"),
+    "Last 24 hours": (pd.Timedelta(days=1), "15min"),
+    "Last 7 days": (pd.Timedelta(days=7), "1h"),
+    "All time": (None, "1D"),
+}
+
+def _content_key(items):
+    return hashlib.sha256("\x00".join(map(str, items)).encode("utf-8")).hexdigest()
 
 def show_dashboard(response, symptoms, solutions):
     st.title("Dashboard Analysis")
@@ -8,17 +21,54 @@ def show_dashboard(response, symptoms, solutions):
         st.subheader("Analyzed Response")
         st.write(response)
         
+        # Paged views: long analyses no longer become one static HTML table per rerun
         if symptoms:
             st.subheader("Symptoms Analysis")
             symptoms_df = pd.DataFrame(symptoms, columns=["Symptoms"])
-            st.table(symptoms_df)
+            show_table(symptoms_df, f"symptoms-{_content_key(symptoms)}", "symptoms")
 
         if solutions:
             st.subheader("Solutions Analysis")
             solutions_df = pd.DataFrame(solutions, columns=["Solutions"])
-            st.table(solutions_df)
+            show_table(solutions_df, f"solutions-{_content_key(solutions)}", "solutions")
     else:
         st.write("No analysis available. Please go back and process the invoice.")
 
+def show_metrics():
+    from metrics import METRICS_LOG, load_spans, stage_summary, cache_lookups, timeline
+
+    st.title("Metrics")
+    window = st.selectbox("Period", list(METRICS_WINDOWS), index=1)
+    lookback, bucket = METRICS_WINDOWS[window]
+    since = pd.Timestamp.now(tz="UTC") - lookback if lookback is not None else None
+    spans = load_spans(since=since)
+    if spans.empty:
+        st.write(f"No timing spans recorded yet in {METRICS_LOG}.")
+        return
+
+    lookups = cache_lookups(spans)
+    model_requests = spans[spans["stage"] == "llm.request"]
+    columns = st.columns(4)
+    columns[0].metric("Spans", f"{len(spans):,}")
+    columns[1].metric("Error rate", f"{1 - spans['ok'].mean():.1%}")
+    columns[2].metric("Cache hit rate", f"{(lookups['cache'] == 'hit').mean():.0%}" if not lookups.empty else "-")
+    columns[3].metric("Retries per model request",
+                      f"{model_requests['retries'].mean():.2f}"
+                      if "retries" in model_requests and not model_requests.empty else "-")
+
+    st.subheader("Latency per stage")
+    st.dataframe(stage_summary(spans).style.format(
+        {"p50 ms": "{:,.1f}", "p95 ms": "{:,.1f}", "p99 ms": "{:,.1f}", "error rate": "{:.1%}"}))
+
+    p95, rates = timeline(spans, bucket)
+    stages = st.multiselect("Stages", list(p95.columns),
+                            default=[stage for stage in ("extractor.request", "llm.call", "table.parse")
+                                     if stage in p95.columns])
+    if stages:
+        st.subheader("p95 latency over time (ms)")
+        st.line_chart(p95[stages])
+    st.subheader("Error and cache hit rates over time")
+    st.line_chart(rates)
+
 if __name__ == "__main__":
     show_dashboard("Sample response", ["Symptom 1", "Symptom 2"], ["Solution 1", "Solution 2"])
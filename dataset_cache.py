@@ -0,0 +1,214 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from ingest import read_upload
+
+load_dotenv()
+
+# Cache settings (can be overridden from .env)
+DATASET_CACHE_DIR = os.getenv("DATASET_CACHE_DIR", ".dataset_cache")
+DATASET_MEMORY_BUDGET = int(os.getenv("DATASET_MEMORY_BUDGET_BYTES", str(1024 * 1024 * 1024)))
+DATASET_DISK_BUDGET = int(os.getenv("DATASET_DISK_BUDGET_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+SUPPORTED_EXTENSIONS = ("csv", "xls", "xlsx")
+
+_lock = threading.Lock()
+_frames = OrderedDict()  # content hash -> (DataFrame, bytes), shared by every session
+_memory_bytes = 0
+_reports = OrderedDict()  # content hash -> ingestion report
+_digests = OrderedDict()  # upload file_id -> content hash, so reruns skip re-hashing
+_disk_bytes = None  # Size of DATASET_CACHE_DIR, computed lazily on first write
+
+
+def _extension(file):
+    return file.name.split(".")[-1].lower()  # Ensure lowercase extension
+
+
+def dataset_key(file):
+    file_id = getattr(file, "file_id", None)
+    with _lock:
+        if file_id is not None and file_id in _digests:
+            return _digests[file_id]
+
+    digest = hashlib.sha256()
+    file.seek(0)
+    for block in iter(lambda: file.read(1024 * 1024), b""):
+        digest.update(block)
+    file.seek(0)
+    key = f"{digest.hexdigest()}-{_extension(file)}"
+
+    if file_id is not None:
+        with _lock:
+            _digests[file_id] = key
+            while len(_digests) > 1024:
+                _digests.popitem(last=False)
+    return key
+
+
+def _parquet_path(key):
+    return os.path.join(DATASET_CACHE_DIR, f"{key}.parquet")
+
+
+def _report_path(key):
+    return os.path.join(DATASET_CACHE_DIR, f"{key}.json")
+
+
+def _read_parquet(key):
+    path = _parquet_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        import pyarrow.parquet as pq
+        # Memory-mapped: the columns are paged in from the OS cache, not parsed again
+        data = pq.read_table(path, memory_map=True).to_pandas()
+        os.utime(path)  # Recently used: evicted last
+        return data
+    except Exception as e:  # pyarrow missing or a damaged file: fall back to parsing
+        logging.warning(f"Could not read cached dataset {path}: {e}")
+        return None
+
+
+def _write_parquet(key, data):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        os.makedirs(DATASET_CACHE_DIR, exist_ok=True)
+        path = _parquet_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        pq.write_table(pa.Table.from_pandas(data), tmp_path)
+        os.replace(tmp_path, path)
+    except Exception as e:  # e.g. mixed-type object columns; the memory tier still works
+        logging.warning(f"Could not store dataset as Parquet: {e}")
+        return
+    _account(key, path)
+
+
+def _disk_entries():
+    # (key, bytes, last use) per cached dataset; its Parquet file and report count as one
+    entries = {}
+    try:
+        names = os.listdir(DATASET_CACHE_DIR)
+    except OSError:
+        return []
+    for name in names:
+        key, extension = os.path.splitext(name)
+        if extension not in (".parquet", ".json"):
+            continue
+        try:
+            stat = os.stat(os.path.join(DATASET_CACHE_DIR, name))
+        except OSError:
+            continue
+        size, mtime = entries.get(key, (0, 0.0))
+        entries[key] = (size + stat.st_size, max(mtime, stat.st_mtime))
+    return [(key, size, mtime) for key, (size, mtime) in entries.items()]
+
+
+def _account(key, path):
+    global _disk_bytes
+    with _lock:
+        if _disk_bytes is None:
+            _disk_bytes = sum(size for _, size, _ in _disk_entries())
+        elif os.path.exists(path):
+            _disk_bytes += os.path.getsize(path)
+        over_budget = _disk_bytes > DATASET_DISK_BUDGET
+    if over_budget:
+        evict(keep=key)
+
+
+def evict(keep=None):
+    # Drop the least recently used datasets until the directory is back under budget
+    global _disk_bytes
+    entries = sorted(_disk_entries(), key=lambda entry: entry[2])
+    total = sum(size for _, size, _ in entries)
+    for key, size, _ in entries:
+        if total <= DATASET_DISK_BUDGET:
+            break
+        if key == keep:
+            continue
+        for path in (_parquet_path(key), _report_path(key)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        total -= size
+    with _lock:
+        _disk_bytes = total
+
+
+def _remember(key, data):
+    global _memory_bytes
+    size = int(data.memory_usage(deep=True).sum())
+    with _lock:
+        if key in _frames:
+            _frames.move_to_end(key)
+            return
+        _frames[key] = (data, size)
+        _memory_bytes += size
+        # Evict least recently used datasets, but always keep the one just loaded
+        while _memory_bytes > DATASET_MEMORY_BUDGET and len(_frames) > 1:
+            _, (_, evicted_size) = _frames.popitem(last=False)
+            _memory_bytes -= evicted_size
+
+
+def _store_report(key, report):
+    with _lock:
+        _reports[key] = report
+        while len(_reports) > 1024:
+            _reports.popitem(last=False)
+    try:
+        os.makedirs(DATASET_CACHE_DIR, exist_ok=True)
+        with open(_report_path(key), "w", encoding="utf-8") as f:
+            json.dump(report, f)
+    except OSError as e:
+        logging.warning(f"Could not store ingestion report: {e}")
+        return
+    _account(key, _report_path(key))
+
+
+def ingest_report(key):
+    # Memory footprint and sampling details recorded when the upload was first parsed
+    with _lock:
+        report = _reports.get(key)
+    if report is not None:
+        return report
+    try:
+        with open(_report_path(key), "r", encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return None
+    with _lock:
+        _reports[key] = report
+    return report
+
+
+def load_dataset(file):
+    # Parse an upload once; later reruns and other sessions get the same (read-only) frame
+    extension = _extension(file)
+    if extension not in SUPPORTED_EXTENSIONS:
+        return None
+
+    key = dataset_key(file)
+    with _lock:
+        entry = _frames.get(key)
+        if entry is not None:
+            _frames.move_to_end(key)
+            return entry[0]
+
+    data = _read_parquet(key)
+    if data is None:
+        file.seek(0)
+        data, report = read_upload(file, extension)
+        _store_report(key, report)
+        _write_parquet(key, data)
+    _remember(key, data)
+    return data
+
+
+def cache_stats():
+    with _lock:
+        return {"datasets": len(_frames), "memory_bytes": _memory_bytes, "budget_bytes": DATASET_MEMORY_BUDGET,
+                "disk_bytes": _disk_bytes, "disk_budget_bytes": DATASET_DISK_BUDGET}
@@ -0,0 +1,123 @@
+import os
+import logging
+import threading
+from functools import lru_cache
+from itertools import combinations
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Near-duplicate settings (can be overridden from .env)
+NEAR_DUPLICATE_DISTANCE = int(os.getenv("NEAR_DUPLICATE_DISTANCE", "7"))  # Differing bits out of 64
+HASH_SIZE = 8  # dHash grid: 8x8 comparisons -> 64-bit hash
+HASH_BANDS = 4  # 16-bit bands for the multi-index lookup
+
+
+def dhash(image):
+    # Difference hash: each bit says whether a pixel is brighter than its right neighbour on a
+    # 9x8 grayscale thumbnail. Survives re-encoding, resizing, lighting and small crops.
+    from PIL import Image
+
+    small = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(HASH_SIZE):
+        line = pixels[row * (HASH_SIZE + 1):(row + 1) * (HASH_SIZE + 1)]
+        for left, right in zip(line, line[1:]):
+            value = (value << 1) | (left > right)
+    return value
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(width, radius):
+    # Every XOR mask of at most `radius` set bits within a band
+    masks = [0]
+    for bits in range(1, radius + 1):
+        masks.extend(sum(1 << bit for bit in chosen) for chosen in combinations(range(width), bits))
+    return masks
+
+
+class HashIndex:
+    # Multi-index hashing over 64-bit hashes: each hash is cut into `bands` bands with one
+    # lookup table per band. Two hashes at most d bits apart differ by at most d // bands bits
+    # on some band, so a search only probes those few band values instead of every hash.
+
+    def __init__(self, bands=HASH_BANDS):
+        self.bands = bands
+        self.width = 64 // bands
+        self._mask = (1 << self.width) - 1
+        self._tables = [{} for _ in range(bands)]
+        self._hashes = {}  # id -> hash
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def add(self, key, value):
+        self._hashes[key] = value
+        for band, table in enumerate(self._tables):
+            table.setdefault((value >> (band * self.width)) & self._mask, []).append(key)
+
+    def search(self, value, max_distance):
+        # (distance, id) of the closest stored hash within max_distance, or None
+        masks = _flip_masks(self.width, max_distance // self.bands)
+        best = None
+        seen = set()
+        for band, table in enumerate(self._tables):
+            part = (value >> (band * self.width)) & self._mask
+            for flip in masks:
+                keys = table.get(part ^ flip)
+                if not keys:
+                    continue
+                for key in keys:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    distance = (value ^ self._hashes[key]).bit_count()
+                    if distance <= max_distance and (best is None or distance < best[0]):
+                        best = (distance, key)
+        return best
+
+
+_lock = threading.Lock()
+_index = HashIndex()
+_last_id = 0  # Highest stored hash already in _index
+
+
+def _sync():
+    # Loads hashes stored since the last lookup (all of them on first use)
+    global _last_id
+    from results_store import image_hashes
+
+    for hash_id, value in image_hashes(_last_id):
+        _index.add(hash_id, value)
+        _last_id = hash_id
+
+
+def find_near_duplicate(value, max_distance=NEAR_DUPLICATE_DISTANCE):
+    # {"distance", "source", "response", "added_at"} of the closest earlier image, or None
+    from results_store import image_response
+
+    with _lock:
+        _sync()
+        match = _index.search(value, max_distance)
+    if match is None:
+        return None
+    distance, hash_id = match
+    source, response, added_at = image_response(hash_id)
+    return {"distance": distance, "source": source, "response": response, "added_at": added_at}
+
+
+def remember_image(value, source, response):
+    # Records an extracted image so later re-shoots of it are recognised; a hash already
+    # stored (re-sends, cached answers) is not written again
+    from results_store import add_image_hash
+
+    try:
+        with _lock:
+            _sync()
+            if _index.search(value, 0) is not None:
+                return
+            add_image_hash(value, source, response)
+            _sync()
+    except Exception as e:
+        logging.error(f"Error storing image hash for {source}: {e}")
@@ -0,0 +1,146 @@
+import os
+import re
+import logging
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Ingestion settings (can be overridden from .env)
+INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "200000"))
+INGEST_CATEGORY_RATIO = float(os.getenv("INGEST_CATEGORY_RATIO", "0.5"))
+INGEST_MEMORY_LIMIT_BYTES = int(os.getenv("INGEST_MEMORY_LIMIT_BYTES", str(500 * 1024 * 1024)))
+INGEST_SAMPLE_ROWS = int(os.getenv("INGEST_SAMPLE_ROWS", "200000"))
+# float32 halves float columns but shows 5.2 as 5.1999998 once read back as float64: opt-in
+INGEST_FLOAT32 = os.getenv("INGEST_FLOAT32", "0") != "0"
+INGEST_TOP_VALUES = 50  # Value counts reported per string column in out-of-core mode
+INGEST_TRACKED_VALUES = 10000  # Distinct values tracked per string column while streaming
+
+DATE_PATTERN = re.compile(r"^\s*\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}")
+
+
+def _downcast_numbers(chunk):
+    for column in chunk.columns:
+        values = chunk[column]
+        if pd.api.types.is_bool_dtype(values):
+            continue
+        if pd.api.types.is_integer_dtype(values):
+            chunk[column] = pd.to_numeric(values, downcast="integer")
+        elif INGEST_FLOAT32 and pd.api.types.is_float_dtype(values):
+            as_float32 = values.astype("float32")
+            # Only when every value prints the same in float32 (its shortest repr) as it was read
+            printed = as_float32.to_numpy().astype(str).astype("float64")
+            if np.array_equal(values.to_numpy(), printed, equal_nan=True):
+                chunk[column] = as_float32
+    return chunk
+
+
+def _looks_like_dates(values):
+    sample = values.dropna().astype(str).head(200)
+    if sample.empty:
+        return False
+    return sample.str.match(DATE_PATTERN).mean() >= 0.9
+
+
+def _finish_columns(data):
+    # Dates are parsed once here, low-cardinality strings become categoricals
+    for column in data.columns:
+        values = data[column]
+        if not pd.api.types.is_object_dtype(values):
+            continue
+        if _looks_like_dates(values):
+            parsed = pd.to_datetime(values, errors="coerce")
+            if parsed.notna().sum() >= 0.9 * values.notna().sum():
+                data[column] = parsed
+                continue
+        if len(values) and values.nunique(dropna=True) <= INGEST_CATEGORY_RATIO * len(values):
+            data[column] = values.astype("category")
+    return data
+
+
+def _file_size(file):
+    size = getattr(file, "size", None)
+    if size is None:
+        file.seek(0, os.SEEK_END)
+        size = file.tell()
+    file.seek(0)
+    return size
+
+
+def _read_in_memory(chunks, report):
+    parts = []
+    for chunk in chunks:
+        report["bytes_before"] += int(chunk.memory_usage(deep=True).sum())
+        parts.append(_downcast_numbers(chunk))
+    data = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    return _finish_columns(data)
+
+
+def _read_out_of_core(chunks, report):
+    # Keep a uniform random sample (bottom-k on random keys) plus whole-file aggregates
+    rng = np.random.default_rng()
+    sample = None
+    rows = 0
+    numeric = {}
+    top_values = {}
+    for chunk in chunks:
+        report["bytes_before"] += int(chunk.memory_usage(deep=True).sum())
+        rows += len(chunk)
+        for column in chunk.select_dtypes(include="number").columns:
+            values = chunk[column]
+            stats = numeric.setdefault(column, {"count": 0, "sum": 0.0, "min": np.inf, "max": -np.inf})
+            stats["count"] += int(values.count())
+            stats["sum"] += float(values.sum())
+            stats["min"] = min(stats["min"], float(values.min())) if values.count() else stats["min"]
+            stats["max"] = max(stats["max"], float(values.max())) if values.count() else stats["max"]
+        for column in chunk.select_dtypes(include="object").columns:
+            counts = top_values.get(column, pd.Series(dtype="int64"))
+            counts = counts.add(chunk[column].value_counts(), fill_value=0)
+            if len(counts) > INGEST_TRACKED_VALUES:  # Free-text columns: keep the heavy hitters only
+                counts = counts.nlargest(INGEST_TRACKED_VALUES)
+            top_values[column] = counts
+
+        chunk = _downcast_numbers(chunk)
+        chunk["_sample_key"] = rng.random(len(chunk))
+        chunk["_sample_row"] = np.arange(rows - len(chunk), rows)
+        sample = chunk if sample is None else pd.concat([sample, chunk], ignore_index=True)
+        sample = sample.nsmallest(INGEST_SAMPLE_ROWS, "_sample_key")
+
+    if sample is None:
+        data = pd.DataFrame()
+    else:
+        # Back to file order so line charts and previews still make sense
+        data = sample.sort_values("_sample_row").drop(columns=["_sample_key", "_sample_row"]).reset_index(drop=True)
+    for stats in numeric.values():
+        stats["mean"] = stats["sum"] / stats["count"] if stats["count"] else None
+    report["out_of_core"] = True
+    report["total_rows"] = rows
+    report["aggregates"] = {
+        "numeric": numeric,
+        "top_values": {column: {str(k): int(v) for k, v in counts.nlargest(INGEST_TOP_VALUES).items()}
+                       for column, counts in top_values.items()},
+    }
+    return _finish_columns(data)
+
+
+def read_upload(file, extension):
+    # Returns the DataFrame and an ingestion report (memory before/after, sampling)
+    size = _file_size(file)
+    report = {"file_bytes": size, "bytes_before": 0, "bytes_after": 0, "out_of_core": False}
+    if extension == "csv":
+        chunks = pd.read_csv(file, chunksize=INGEST_CHUNK_ROWS)
+    else:
+        chunks = [pd.read_excel(file)]  # Excel can't be read in chunks
+
+    if size > INGEST_MEMORY_LIMIT_BYTES:
+        logging.info(f"Upload of {size} bytes exceeds the in-memory limit, keeping a sample")
+        data = _read_out_of_core(chunks, report)
+    else:
+        data = _read_in_memory(chunks, report)
+        report["total_rows"] = len(data)
+
+    report["bytes_after"] = int(data.memory_usage(deep=True).sum())
+    report["rows"] = len(data)
+    logging.info(f"Ingested {report['rows']} rows: {report['bytes_before']} -> {report['bytes_after']} bytes")
+    return data, report
@@ -0,0 +1,115 @@
+import os
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Job queue settings (can be overridden from .env)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))  # Finished jobs kept this long
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "0.5"))
+
+
+class Job:
+    # State of one submitted job; the worker publishes partial results through update()
+
+    def __init__(self, job_id, key):
+        self.id = job_id
+        self.key = key
+        self.state = "queued"  # queued -> running -> done | failed
+        self.result = None
+        self.error = None
+        self.progress = {}
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def update(self, **progress):
+        with self._lock:
+            self.progress.update(progress)
+
+    def snapshot(self):
+        with self._lock:
+            return {"id": self.id, "state": self.state, "result": self.result, "error": self.error,
+                    "progress": dict(self.progress), "submitted_at": self.submitted_at,
+                    "finished_at": self.finished_at}
+
+
+class JobQueue:
+    # Process-wide jobs run on a worker pool, outside any Streamlit script run: a rerun or a
+    # page switch only stops the page polling, not the job. Submitting a key that is queued,
+    # running or finished within the retention time returns that job instead of a new one.
+
+    def __init__(self, workers=JOB_WORKERS, retention=JOB_RETENTION_SECONDS):
+        self.workers = workers
+        self.retention = retention
+        self._pool = None
+        self._lock = threading.Lock()
+        self._jobs = {}  # id -> Job
+        self._by_key = {}  # key -> id of the latest job for it
+        self._stats = {"submitted": 0, "deduplicated": 0, "errors": 0}
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        return self._pool
+
+    def _expire(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and now - job.finished_at > self.retention:
+                del self._jobs[job_id]
+                if self._by_key.get(job.key) == job_id:
+                    del self._by_key[job.key]
+
+    def _run(self, job, fn, kwargs):
+        job.state = "running"
+        try:
+            result = fn(job, **kwargs)
+        except Exception as e:
+            logging.error(f"Job {job.id} failed: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+            job.error = e
+            job.state = "failed"
+        else:
+            job.result = result
+            job.state = "done"
+        finally:
+            job.finished_at = time.time()
+
+    def submit(self, key, fn, **kwargs):
+        # Runs fn(job, **kwargs) in the background and returns the job id; a failed job is retried
+        with self._lock:
+            self._expire()
+            job_id = self._by_key.get(key)
+            if job_id is not None and self._jobs[job_id].state != "failed":
+                self._stats["deduplicated"] += 1
+                return job_id
+            job = Job(uuid.uuid4().hex, key)
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+            self._stats["submitted"] += 1
+            # The job keeps the caller's context, so its timing spans join the caller's trace
+            self._get_pool().submit(contextvars.copy_context().run, self._run, job, fn, kwargs)
+        return job.id
+
+    def get(self, job_id):
+        # Snapshot of the job, or None once it expired (or the server restarted)
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+        return job.snapshot() if job is not None else None
+
+    def stats(self):
+        with self._lock:
+            states = [job.state for job in self._jobs.values()]
+            return dict(self._stats, **{state: states.count(state) for state in ("queued", "running", "done", "failed")})
+
+
+job_queue = JobQueue()
@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from io import StringIO
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Span log settings (can be overridden from .env). Not requests.jsonl: that file is the
+# team's backlog, not a log.
+METRICS_LOG = os.getenv("METRICS_LOG", "metrics.jsonl")
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+# A full log is moved to <log>.1 (replacing the one before), so at most twice this is kept
+METRICS_MAX_BYTES = int(os.getenv("METRICS_MAX_BYTES", str(50 * 1024 * 1024)))
+SPAN_COLUMNS = ["ts", "trace", "stage", "ms", "ok", "error"]
+
+_lock = threading.Lock()
+_log_file = None
+_log_bytes = 0
+_trace = contextvars.ContextVar("trace", default=None)
+_read_lock = threading.Lock()
+_parsed = {}  # log path -> (inode, bytes parsed, spans), so a rerun only parses new lines
+
+
+def _write(record):
+    global _log_file, _log_bytes
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _lock:
+        try:
+            if _log_file is None:
+                _log_file = open(METRICS_LOG, "a", encoding="utf-8", buffering=1)  # Line buffered
+                _log_bytes = os.path.getsize(METRICS_LOG)
+            _log_file.write(line)
+            _log_bytes += len(line.encode("utf-8"))
+            if _log_bytes > METRICS_MAX_BYTES:
+                _log_file.close()
+                _log_file = None
+                os.replace(METRICS_LOG, f"{METRICS_LOG}.1")
+        except OSError as e:
+            logging.warning(f"Could not write metrics span: {e}")
+
+
+@contextmanager
+def span(stage, **fields):
+    # Times the block and appends one JSON line: stage, start, duration, outcome and fields.
+    # The yielded dict can be filled in the block (sizes, retries, cache outcome...).
+    # Spans opened inside another one share its trace id, so one extraction reads as a unit.
+    if not METRICS_ENABLED:
+        yield fields
+        return
+    trace = _trace.get()
+    token = None
+    if trace is None:
+        trace = uuid.uuid4().hex[:12]
+        token = _trace.set(trace)
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield fields
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        if token is not None:
+            _trace.reset(token)
+        _write({"ts": started_at.isoformat(timespec="milliseconds"), "trace": trace, "stage": stage,
+                "ms": round((time.perf_counter() - started) * 1000, 3), "ok": error is None, "error": error,
+                **fields})
+
+
+def record(stage, ms, ok=True, **fields):
+    # A span measured elsewhere, e.g. time to first chunk of a stream
+    if METRICS_ENABLED:
+        _write({"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "trace": _trace.get(),
+                "stage": stage, "ms": round(ms, 3), "ok": ok, "error": None, **fields})
+
+
+def _read_log(path):
+    # Spans of one log file; only the lines appended since the last call are parsed
+    try:
+        stat = os.stat(path)
+    except OSError:
+        _parsed.pop(path, None)
+        return None
+    inode, offset, spans = _parsed.get(path, (None, 0, None))
+    if inode != stat.st_ino or stat.st_size < offset:  # Rotated or replaced: start over
+        offset, spans = 0, None
+    if stat.st_size > offset:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read(stat.st_size - offset)
+        data = data[:data.rfind(b"\n") + 1]  # A line still being written waits for the next call
+        if data:
+            new = pd.read_json(StringIO(data.decode("utf-8")), lines=True, convert_dates=False)
+            new["ts"] = pd.to_datetime(new["ts"], utc=True)
+            spans = new if spans is None else pd.concat([spans, new], ignore_index=True)
+            offset += len(data)
+    _parsed[path] = (stat.st_ino, offset, spans)
+    return spans
+
+
+def load_spans(path=METRICS_LOG, since=None):
+    # Spans as a DataFrame (ts parsed) from the log and the one rotated out before it,
+    # optionally only those after `since`
+    with _lock:
+        if _log_file is not None:
+            _log_file.flush()
+    parts = []
+    for log_path in (f"{path}.1", path):
+        # The rotated log is skipped when it ended before the window
+        if log_path != path and since is not None and os.path.exists(log_path) and \
+                pd.Timestamp(os.path.getmtime(log_path), unit="s", tz="UTC") < since:
+            continue
+        with _read_lock:
+            spans = _read_log(log_path)
+        if spans is not None and not spans.empty:
+            parts.append(spans)
+    if not parts:
+        return pd.DataFrame(columns=SPAN_COLUMNS)
+    spans = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+    if since is not None:
+        spans = spans[spans["ts"] >= since]
+    return spans
+
+
+def stage_summary(spans):
+    # Count, p50/p95/p99 latency and error rate per stage
+    if spans.empty:
+        return pd.DataFrame(columns=["count", "p50 ms", "p95 ms", "p99 ms", "error rate"])
+    grouped = spans.groupby("stage")
+    summary = grouped["ms"].quantile([0.5, 0.95, 0.99]).unstack()
+    summary.columns = ["p50 ms", "p95 ms", "p99 ms"]
+    summary.insert(0, "count", grouped.size())
+    summary["error rate"] = 1 - grouped["ok"].mean()
+    return summary.sort_values("p95 ms", ascending=False)
+
+
+CACHE_STAGES = ("llm.generate", "llm.stream")  # Spans carrying a cache="hit"/"miss" field
+
+
+def cache_lookups(spans):
+    if "cache" not in spans.columns:
+        return spans.iloc[0:0]
+    return spans[spans["stage"].isin(CACHE_STAGES) & spans["cache"].notna()]
+
+
+def timeline(spans, freq):
+    # Per time bucket: p95 latency of each stage, overall error rate and cache hit rate
+    indexed = spans.set_index("ts")
+    p95 = indexed.groupby([pd.Grouper(freq=freq), "stage"])["ms"].quantile(0.95).unstack("stage")
+    rates = pd.DataFrame({"error rate": 1 - indexed["ok"].astype(float).resample(freq).mean()})
+    lookups = cache_lookups(spans).set_index("ts")
+    if not lookups.empty:
+        rates["cache hit rate"] = (lookups["cache"] == "hit").astype(float).resample(freq).mean()
+    return p95, rates
@@ -0,0 +1,235 @@
+import re
+import logging
+import unicodedata
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+ENGLISH_HEADERS = ['Name', 'Parameter', 'Unit', 'Result', 'Value']
+FRENCH_HEADERS = ['Nom', 'Paramètre', 'Unité', 'Résultat', 'Valeur']
+
+# Columns added by normalize_table
+STANDARD_PARAMETER = "Standard Parameter"
+STANDARD_RESULT = "Standard Result"
+STANDARD_UNIT = "Standard Unit"
+
+# Extracted headers (English or French, folded) -> field
+HEADER_FIELDS = {
+    "name": "patient", "nom": "patient", "patient": "patient",
+    "parameter": "parameter", "parametre": "parameter", "test": "parameter", "analyse": "parameter",
+    "examen": "parameter",
+    "unit": "unit", "unite": "unit", "units": "unit", "unites": "unit",
+    "result": "result", "resultat": "result", "resultats": "result",
+    "value": "reference", "valeur": "reference", "reference": "reference",
+    "valeurs de reference": "reference", "normes": "reference",
+    "source image": "source",
+    "standard parameter": "canonical_parameter", "standard result": "canonical_value",
+    "standard unit": "canonical_unit",
+}
+
+# Canonical parameter -> (canonical unit, {other unit: factor to the canonical unit}, synonyms)
+PARAMETERS = {
+    "Glucose": ("mmol/L", {"mg/dL": 0.05551, "g/L": 5.551, "mg/L": 0.005551},
+                ["glucose", "glycemie", "glycemie a jeun", "fasting glucose", "blood glucose", "blood sugar", "glu"]),
+    "Hemoglobin": ("g/dL", {"g/L": 0.1, "mmol/L": 1.611},
+                   ["hemoglobin", "haemoglobin", "hemoglobine", "hgb", "hb"]),
+    "HbA1c": ("%", {}, ["hba1c", "hemoglobine glyquee", "hemoglobine glycosylee", "glycated hemoglobin", "a1c"]),
+    "Hematocrit": ("%", {"L/L": 100.0}, ["hematocrit", "haematocrit", "hematocrite", "hct", "ht"]),
+    "Red blood cells": ("10^12/L", {"10^6/µL": 1.0, "/mm3": 1e-6},
+                        ["red blood cells", "erythrocytes", "globules rouges", "hematies", "rbc", "gr"]),
+    "White blood cells": ("10^9/L", {"10^3/µL": 1.0, "/mm3": 1e-3},
+                          ["white blood cells", "leukocytes", "leucocytes", "globules blancs", "wbc", "gb"]),
+    "Platelets": ("10^9/L", {"10^3/µL": 1.0, "/mm3": 1e-3},
+                  ["platelets", "plaquettes", "thrombocytes", "plt"]),
+    "Creatinine": ("µmol/L", {"mg/dL": 88.42, "mg/L": 8.842},
+                   ["creatinine", "creatininemie", "creat"]),
+    "Urea": ("mmol/L", {"g/L": 16.65, "mg/dL": 0.1665, "mg/L": 0.01665},
+             ["urea", "uree", "uremie"]),
+    "Uric acid": ("µmol/L", {"mg/L": 5.948, "mg/dL": 59.48},
+                  ["uric acid", "acide urique", "uricemie"]),
+    "Total cholesterol": ("mmol/L", {"g/L": 2.586, "mg/dL": 0.02586},
+                          ["total cholesterol", "cholesterol total", "cholesterol"]),
+    "HDL cholesterol": ("mmol/L", {"g/L": 2.586, "mg/dL": 0.02586},
+                        ["hdl cholesterol", "cholesterol hdl", "hdl c", "hdl"]),
+    "LDL cholesterol": ("mmol/L", {"g/L": 2.586, "mg/dL": 0.02586},
+                        ["ldl cholesterol", "cholesterol ldl", "ldl c", "ldl"]),
+    "Triglycerides": ("mmol/L", {"g/L": 1.129, "mg/dL": 0.01129},
+                      ["triglycerides", "triglyceride", "tg"]),
+    "Sodium": ("mmol/L", {"mEq/L": 1.0}, ["sodium", "natremie", "na"]),
+    "Potassium": ("mmol/L", {"mEq/L": 1.0}, ["potassium", "kaliemie", "k"]),
+    "Chloride": ("mmol/L", {"mEq/L": 1.0}, ["chloride", "chlore", "chloremie", "cl"]),
+    "Calcium": ("mmol/L", {"mg/L": 0.02495, "mg/dL": 0.2495}, ["calcium", "calcemie", "ca"]),
+    "Magnesium": ("mmol/L", {"mg/L": 0.04114, "mg/dL": 0.4114}, ["magnesium", "magnesemie", "mg"]),
+    "Phosphorus": ("mmol/L", {"mg/L": 0.03229, "mg/dL": 0.3229},
+                   ["phosphorus", "phosphate", "phosphore", "phosphoremie"]),
+    "Iron": ("µmol/L", {"µg/dL": 0.1791, "mg/L": 17.91}, ["iron", "fer", "fer serique", "serum iron", "sideremie"]),
+    "Ferritin": ("µg/L", {"ng/mL": 1.0}, ["ferritin", "ferritine"]),
+    "Total bilirubin": ("µmol/L", {"mg/dL": 17.1, "mg/L": 1.71},
+                        ["total bilirubin", "bilirubine totale", "bilirubin", "bilirubine"]),
+    "Albumin": ("g/L", {"g/dL": 10.0}, ["albumin", "albumine", "albuminemie"]),
+    "Total protein": ("g/L", {"g/dL": 10.0}, ["total protein", "proteines totales", "protidemie"]),
+    "CRP": ("mg/L", {"mg/dL": 10.0}, ["crp", "c reactive protein", "proteine c reactive"]),
+    "AST": ("U/L", {"µkat/L": 60.0}, ["ast", "asat", "sgot", "aspartate aminotransferase", "tgo"]),
+    "ALT": ("U/L", {"µkat/L": 60.0}, ["alt", "alat", "sgpt", "alanine aminotransferase", "tgp"]),
+    "GGT": ("U/L", {"µkat/L": 60.0}, ["ggt", "gamma gt", "gamma glutamyl transferase", "gamma glutamyltransferase"]),
+    "Alkaline phosphatase": ("U/L", {"µkat/L": 60.0},
+                             ["alkaline phosphatase", "phosphatases alcalines", "alp", "pal"]),
+    "TSH": ("mIU/L", {"µIU/mL": 1.0}, ["tsh", "thyreostimuline", "thyroid stimulating hormone"]),
+    "Vitamin D": ("ng/mL", {"nmol/L": 0.4006},
+                  ["vitamin d", "vitamine d", "25 oh vitamin d", "25 oh vitamine d", "25 oh d"]),
+}
+
+# Spellings seen on lab sheets that folding alone does not map to a canonical unit
+UNIT_ALIASES = {"ui/l": "U/L", "iu/l": "U/L", "mui/l": "mIU/L", "miu/l": "mIU/L", "uui/ml": "µIU/mL",
+                "uiu/ml": "µIU/mL", "/ul": "/mm3", "mm3": "/mm3", "elements/mm3": "/mm3",
+                "giga/l": "10^9/L", "tera/l": "10^12/L", "meq/l": "mEq/L"}
+# Checked before folding: in French hematology G/L and T/L are giga and tera per litre
+CASE_SENSITIVE_UNITS = {"G/L": "10^9/L", "T/L": "10^12/L"}
+
+MIN_SEARCH_LENGTH = 4  # Shorter synonyms (k, na, hb...) must match the whole label
+
+SUPERSCRIPTS = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹μµ", "0123456789uu")
+
+
+def fold_text(text):
+    # Case, accent and punctuation insensitive form used for every lookup
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.sub(r"[^0-9a-z]+", " ", text.casefold()).split())
+
+
+def fold_unit(unit):
+    # "µmol/L", "umol / l" -> "umol/l"; "10⁹/L", "x10^9/l" -> "109/l"
+    unit = str(unit).translate(SUPERSCRIPTS).replace("^", "").replace(" ", "").casefold()
+    return unit[1:] if unit.startswith("x10") else unit
+
+
+def _build_indexes():
+    synonyms = {}
+    units = {}
+    for name, (canonical_unit, factors, words) in PARAMETERS.items():
+        for word in [name] + words:
+            synonyms.setdefault(fold_text(word), name)
+        for unit in [canonical_unit, *factors]:
+            units[fold_unit(unit)] = unit
+    units.update(UNIT_ALIASES)
+    # Searched inside longer labels: longest synonym first, so "cholesterol hdl" wins over
+    # "cholesterol"; abbreviations such as "k" or "na" only ever match a whole label
+    words = sorted((word for word in synonyms if len(word) >= MIN_SEARCH_LENGTH), key=len, reverse=True)
+    pattern = re.compile(r"\b(" + "|".join(re.escape(word) for word in words) + r")\b")
+    return synonyms, pattern, units
+
+
+SYNONYMS, SYNONYM_PATTERN, UNITS = _build_indexes()
+FRENCH_WORDS = {fold_text(header) for header in FRENCH_HEADERS}
+ENGLISH_WORDS = {fold_text(header) for header in ENGLISH_HEADERS}
+
+
+def column_fields(columns):
+    # {field: column} for the columns whose header is recognised
+    fields = {}
+    for column in columns:
+        field = HEADER_FIELDS.get(fold_text(column))
+        if field and field not in fields:
+            fields[field] = column
+    return fields
+
+
+@lru_cache(maxsize=4096)
+def canonical_parameter(name):
+    # Exact synonym first, then the longest synonym found inside the label ("Glycémie à jeun (GAJ)")
+    folded = fold_text(name)
+    if folded in SYNONYMS:
+        return SYNONYMS[folded]
+    match = SYNONYM_PATTERN.search(folded)
+    return SYNONYMS[match.group(1)] if match else None
+
+
+@lru_cache(maxsize=1024)
+def canonical_unit(unit):
+    unit = str(unit).strip()
+    if unit in CASE_SENSITIVE_UNITS:
+        return CASE_SENSITIVE_UNITS[unit]
+    return UNITS.get(fold_unit(unit), unit or None)
+
+
+def _factor(parameter, unit):
+    # Multiplier from unit to the parameter's canonical unit, NaN when it is unknown
+    if parameter is None or unit is None:
+        return np.nan
+    target, factors, _ = PARAMETERS[parameter]
+    if unit == target:
+        return 1.0
+    return factors.get(unit, np.nan)
+
+
+@lru_cache(maxsize=256)
+def header_language(headers):
+    # Language of a header row (tuple of cells): the known header names decide, langdetect
+    # on the header text is only the fallback, and each distinct row is detected once
+    folded = {fold_text(header) for header in headers}
+    if folded & FRENCH_WORDS:
+        return 'fr'
+    if folded & ENGLISH_WORDS:
+        return 'en'
+    try:
+        from langdetect import DetectorFactory, detect
+        DetectorFactory.seed = 0  # Deterministic, so the cached answer is the answer
+        return detect(" ".join(headers))
+    except Exception as e:
+        logging.error(f"Error detecting language: {e}")
+        return 'en'
+
+
+def numeric_values(values):
+    # Lab results as floats: "5,2" -> 5.2, anything else -> NaN. A qualified result ("<0.5",
+    # ">= 90") is a bound, not a value, so it stays NaN here and keeps its text in the result
+    # column, as table_parser does.
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    cleaned = values.astype(str).str.replace(",", ".", regex=False).str.strip()
+    return pd.to_numeric(cleaned, errors="coerce")
+
+
+def normalize_table(df):
+    # Adds canonical parameter, value and unit columns. Names and units are resolved once per
+    # distinct value (extracted tables repeat the same few), then the conversion factors are
+    # applied to the whole result column as one NumPy multiplication.
+    fields = column_fields(df.columns)
+    if df.empty or "parameter" not in fields or "result" not in fields:
+        return df
+
+    name_codes, names = pd.factorize(df[fields["parameter"]].astype(str))
+    parameters = np.array([canonical_parameter(name) for name in names], dtype=object)
+    # Unit code 0 stands for "no unit column"
+    if "unit" in fields:
+        unit_codes, units = pd.factorize(df[fields["unit"]].astype(str))
+        unit_codes = unit_codes + 1
+        units = [canonical_unit(unit) for unit in units]
+    else:
+        unit_codes, units = np.zeros(len(df), dtype=np.int64), []
+    units = np.array([None] + units, dtype=object)
+
+    # One factor per distinct (parameter, unit) pair
+    width = len(units)
+    pair_codes, pairs = pd.factorize(name_codes.astype(np.int64) * width + unit_codes)
+    factors = np.array([_factor(parameters[pair // width], units[pair % width]) for pair in pairs], dtype=float)
+    targets = np.array([PARAMETERS[p][0] if p is not None else None for p in parameters], dtype=object)
+
+    row_factors = factors[pair_codes]
+    df = df.copy()
+    df[STANDARD_PARAMETER] = parameters[name_codes]
+    df[STANDARD_RESULT] = numeric_values(df[fields["result"]]).to_numpy() * row_factors
+    df[STANDARD_UNIT] = np.where(np.isnan(row_factors), units[unit_codes], targets[name_codes])
+    return df
+
+
+def relabel_columns(df):
+    # Standard FR/EN headers for five-column tables whose headers aren't recognised, then the
+    # canonical columns. Recognised headers are kept: their order says nothing about the
+    # standard one ("Analyse | Résultat | Unité | ..."). The language comes from the header
+    # row only (cached per distinct row), not from the whole response.
+    fields = column_fields(df.columns)
+    if df.shape[1] == len(ENGLISH_HEADERS) and not ("parameter" in fields and "result" in fields):
+        headers = FRENCH_HEADERS if header_language(tuple(map(str, df.columns))) == 'fr' else ENGLISH_HEADERS
+        df.columns = headers
+    return normalize_table(df)
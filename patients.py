@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+PATIENT_COLUMN = "Name"
+MAX_INDEXES = 32  # Datasets whose patient index stays cached
+
+
+class PatientIndex:
+    # Built once per dataset: patient -> row positions, plus a sorted name array for type-ahead
+
+    def __init__(self, data, column=PATIENT_COLUMN):
+        self.data = data
+        self.column = column
+        self.positions = data.groupby(column, observed=True, sort=False).indices
+        names = np.array(list(self.positions), dtype=object)
+        folded = np.array([str(name).casefold() for name in names])
+        order = np.argsort(folded, kind="stable")
+        self.names = names[order]
+        self._folded = folded[order]
+        self._summaries = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.names)
+
+    def rows(self, name):
+        # O(1) lookup, then one positional take
+        positions = self.positions.get(name)
+        if positions is None:
+            return self.data.iloc[0:0]
+        return self.data.iloc[positions]
+
+    def search(self, prefix, limit=50):
+        # Case-insensitive prefix match with two binary searches on the sorted names
+        if not prefix or not len(self.names):
+            return list(self.names[:limit])
+        folded = prefix.casefold()
+        start = np.searchsorted(self._folded, folded, side="left")
+        end = np.searchsorted(self._folded, folded + "\U0010ffff", side="left")
+        return list(self.names[start:min(end, start + limit)])
+
+    def summary(self, name):
+        with self._lock:
+            cached = self._summaries.get(name)
+        if cached is not None:
+            return cached
+        rows = self.rows(name)
+        numeric = rows.select_dtypes(include="number")
+        summary = {
+            "rows": len(rows),
+            "stats": numeric.agg(["count", "mean", "min", "max"]).T if not numeric.empty else pd.DataFrame(),
+        }
+        with self._lock:
+            self._summaries[name] = summary
+        return summary
+
+
+_lock = threading.Lock()
+_indexes = OrderedDict()  # dataset key -> PatientIndex
+
+
+def get_patient_index(key, data, column=PATIENT_COLUMN):
+    with _lock:
+        index = _indexes.get((key, column))
+        if index is not None:
+            _indexes.move_to_end((key, column))
+            return index
+    index = PatientIndex(data, column)
+    with _lock:
+        _indexes[(key, column)] = index
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
@@ -0,0 +1,100 @@
+import os
+import hashlib
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+from preprocess import IMAGE_MAX_SIDE, IMAGE_QUALITY
+
+load_dotenv()
+
+# PDF input settings (can be overridden from .env)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+PDF_TEXT_MIN_CHARS = int(os.getenv("PDF_TEXT_MIN_CHARS", "50"))  # Less text than this: a scanned page
+PDF_MAX_CONCURRENT_PAGES = int(os.getenv("PDF_MAX_CONCURRENT_PAGES", "16"))  # Model calls per report at once
+PDF_PAGES_CACHE_ENTRIES = 16  # Documents whose pages stay cached across reruns
+
+_lock = threading.Lock()
+_pool = None
+_pages = OrderedDict()  # (content hash, file name, grayscale) -> (pages, skipped page count)
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            # Spawned, not forked: the Streamlit server process runs many threads
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _table_markdown(rows):
+    # Same markdown the model answers with, so text pages go through the usual parser
+    cells = [[str(cell or "").replace("\n", " ").replace("|", "/").strip() for cell in row] for row in rows]
+    lines = ["| " + " | ".join(cells[0]) + " |", "|" + "---|" * len(cells[0])]
+    lines += ["| " + " | ".join(row) + " |" for row in cells[1:]]
+    return "\n".join(lines)
+
+
+def _text_tables(page):
+    # Markdown of the tables found in the page's text layer, None when the page needs the model
+    if len(page.get_text("text").strip()) < PDF_TEXT_MIN_CHARS or not hasattr(page, "find_tables"):
+        return None
+    tables = [table.extract() for table in page.find_tables().tables]
+    tables = [rows for rows in tables if len(rows) > 1]
+    if not tables:
+        return None
+    return "\n\n".join(_table_markdown(rows) for rows in tables)
+
+
+def _render_page(data, index, grayscale):
+    # Runs in a worker process: each one opens its own copy of the document
+    import fitz
+
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        page = doc[index]
+        # Longest side at IMAGE_MAX_SIDE pixels, the size photos are shrunk to before upload
+        zoom = IMAGE_MAX_SIDE / max(page.rect.width, page.rect.height)
+        pixmap = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False,
+                                 colorspace=fitz.csGRAY if grayscale else fitz.csRGB)
+        return pixmap.tobytes("jpeg", jpg_quality=IMAGE_QUALITY)
+
+
+def read_pdf(data, name, grayscale=False):
+    # One entry per page: {"name", "text": markdown} when the text layer holds the tables,
+    # otherwise {"name", "image": blob for the model}. Scanned pages are rasterized in parallel.
+    # Returns the pages and the number of pages past PDF_MAX_PAGES that were left out.
+    import fitz
+
+    key = (hashlib.sha256(data).hexdigest(), name, grayscale)
+    with _lock:
+        if key in _pages:
+            _pages.move_to_end(key)
+            return _pages[key]
+
+    pages = []
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        skipped = max(0, len(doc) - PDF_MAX_PAGES)
+        if skipped:
+            logging.warning(f"{name}: only the first {PDF_MAX_PAGES} of {len(doc)} pages are read")
+        for index in range(min(len(doc), PDF_MAX_PAGES)):
+            page_name = f"{name} (page {index + 1})"
+            markdown = _text_tables(doc[index])
+            pages.append({"name": page_name, "text": markdown} if markdown else {"name": page_name, "index": index})
+
+    scanned = [page for page in pages if "index" in page]
+    if scanned:
+        pool = _get_pool()
+        futures = [pool.submit(_render_page, data, page["index"], grayscale) for page in scanned]
+        for page, future in zip(scanned, futures):
+            page["image"] = {"mime_type": "image/jpeg", "data": future.result()}
+            del page["index"]
+    logging.info(f"{name}: {len(pages) - len(scanned)} text pages, {len(scanned)} pages rasterized")
+    with _lock:
+        _pages[key] = (pages, skipped)
+        while len(_pages) > PDF_PAGES_CACHE_ENTRIES:
+            _pages.popitem(last=False)
+    return pages, skipped
@@ -0,0 +1,97 @@
+import os
+import hashlib
+import logging
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from PIL import Image, ImageOps, features
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Pre-processing defaults (can be overridden from .env)
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1600"))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "JPEG").upper()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+
+MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+PREPARED_CACHE_ENTRIES = 32  # Uploaded photos whose pre-processing stays cached across reruns
+
+_lock = threading.Lock()
+_prepared = OrderedDict()  # (content hash, printed sheet) -> (payload, report, dhash)
+
+
+def _encoded_size(image):
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.tell()
+
+
+def preprocess_image(image, max_side=IMAGE_MAX_SIDE, grayscale=False, normalize_contrast=False,
+                     fmt=IMAGE_FORMAT, quality=IMAGE_QUALITY, original_bytes=None):
+    # Returns the image to display, the blob to send to Gemini and a size report.
+    # The blob matters: a bare PIL image gets re-encoded by the SDK as lossless WebP,
+    # which for a phone photo is bigger than the original JPEG.
+    if original_bytes is None:
+        original_bytes = _encoded_size(image)
+    size_before = image.size
+
+    image = ImageOps.exif_transpose(image)  # Phone photos are often stored sideways
+    if max(image.size) > max_side:
+        image = image.copy()
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    if grayscale:
+        image = ImageOps.grayscale(image)
+    elif image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    if normalize_contrast:
+        image = ImageOps.autocontrast(image, cutoff=1)
+
+    fmt = fmt.upper()
+    if fmt == "WEBP" and not features.check("webp"):
+        logging.warning("WebP is not available in this Pillow build, falling back to JPEG.")
+        fmt = "JPEG"
+    buffer = BytesIO()
+    image.save(buffer, format=fmt, quality=quality, optimize=True)
+    data = buffer.getvalue()
+
+    report = {
+        "bytes_before": original_bytes,
+        "bytes_after": len(data),
+        "size_before": size_before,
+        "size_after": image.size,
+    }
+    logging.info(f"Pre-processed image {size_before} -> {image.size}, {original_bytes} -> {len(data)} bytes")
+    return image, {"mime_type": MIME_TYPES[fmt], "data": data}, report
+
+
+def prepare_photo(data, printed_sheet=False):
+    # Payload, size report and perceptual hash of an uploaded photo, computed once per content:
+    # Streamlit reruns the page on every widget change. Only the compact blob is kept, it is
+    # also what the page displays.
+    from image_index import dhash
+
+    key = (hashlib.sha256(data).hexdigest(), printed_sheet)
+    with _lock:
+        if key in _prepared:
+            _prepared.move_to_end(key)
+            return _prepared[key]
+
+    photo = Image.open(BytesIO(data))
+    photo.load()
+    image, payload, report = preprocess_image(photo, grayscale=printed_sheet, normalize_contrast=printed_sheet,
+                                              original_bytes=len(data))
+    prepared = (payload, report, dhash(image))
+    with _lock:
+        _prepared[key] = prepared
+        while len(_prepared) > PREPARED_CACHE_ENTRIES:
+            _prepared.popitem(last=False)
+    return prepared
+
+
+def format_report(report):
+    saved = 1 - report["bytes_after"] / report["bytes_before"] if report["bytes_before"] else 0
+    return (f"{report['size_before'][0]}x{report['size_before'][1]} → "
+            f"{report['size_after'][0]}x{report['size_after'][1]}, "
+            f"{report['bytes_before'] / 1024:.0f} KB → {report['bytes_after'] / 1024:.0f} KB "
+            f"({saved:.0%} smaller)")
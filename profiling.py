@@ -0,0 +1,127 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Profiling settings (can be overridden from .env)
+PROFILE_SAMPLE_ROWS = int(os.getenv("PROFILE_SAMPLE_ROWS", "1000000"))  # Larger datasets can be sampled
+PROFILE_SKETCH_SIZE = int(os.getenv("PROFILE_SKETCH_SIZE", "256"))  # Quantile sketch accuracy, ~1/k rank error
+PROFILE_CHUNK_ROWS = 65536  # Values fed to the quantile sketch at a time
+PROFILE_TOP_K = 5  # Most frequent values listed per text column
+PROFILE_QUANTILES = {"25%": 0.25, "median": 0.5, "75%": 0.75}
+MAX_PROFILES = 32  # Datasets whose profile stays cached
+
+
+class QuantileSketch:
+    # KLL-style streaming quantiles: an item on level h stands for 2**h values. A level over
+    # its capacity is sorted and every other item (random offset) moves up one level, so the
+    # sketch keeps O(k log n) items whatever the column length.
+
+    def __init__(self, k=PROFILE_SKETCH_SIZE, seed=0):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        # Top level holds k items, each level below two thirds of the one above (at least 2)
+        return max(2, int(self.k * (2 / 3) ** (len(self.levels) - 1 - level)))
+
+    def update(self, values):
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self._capacity(level):
+                items = np.sort(items)
+                # An odd item out stays on this level so no weight is lost
+                kept, items = (items[-1:], items[:-1]) if len(items) % 2 else (items[:0], items)
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level] = kept
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1],
+                                                         items[self._rng.integers(2)::2]])
+            level += 1
+
+    def quantiles(self, fractions):
+        if not self.count:
+            return [np.nan] * len(fractions)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level_items), 2.0 ** level)
+                                  for level, level_items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cumulative, np.asarray(fractions) * cumulative[-1], side="left")
+        return list(items[np.minimum(positions, len(items) - 1)])
+
+
+def _numeric_stats(values):
+    valid = values.to_numpy(dtype="float64", na_value=np.nan)
+    valid = valid[~np.isnan(valid)]
+    if not len(valid):
+        return {}
+    sketch = QuantileSketch()
+    for start in range(0, len(valid), PROFILE_CHUNK_ROWS):
+        sketch.update(valid[start:start + PROFILE_CHUNK_ROWS])
+    stats = {"min": valid.min(), "max": valid.max(), "mean": valid.mean()}
+    stats.update(zip(PROFILE_QUANTILES, sketch.quantiles(list(PROFILE_QUANTILES.values()))))
+    return stats
+
+
+def _category_stats(values):
+    # Distinct count and top values from integer codes: one bincount instead of value_counts
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    present = int(np.count_nonzero(counts))
+    top = np.argsort(counts, kind="stable")[::-1][:min(PROFILE_TOP_K, present)]
+    return {"distinct": present, "top values": ", ".join(f"{uniques[code]} ({counts[code]:,})" for code in top)}
+
+
+def profile_column(values):
+    nulls = int(values.isna().sum())
+    stats = {"dtype": str(values.dtype), "count": len(values) - nulls, "nulls": nulls,
+             "null %": round(100 * nulls / len(values), 2) if len(values) else 0.0}
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        stats.update(_numeric_stats(values))
+    elif pd.api.types.is_datetime64_any_dtype(values):
+        stats.update(min=values.min(), max=values.max())
+    else:
+        stats.update(_category_stats(values))
+    return stats
+
+
+class DatasetProfile:
+    # Built once per dataset: per-column statistics in one pass over each column, on a sample
+    # for very large datasets
+
+    def __init__(self, data, sample=True):
+        self.sampled = sample and len(data) > PROFILE_SAMPLE_ROWS
+        profiled = data.sample(n=PROFILE_SAMPLE_ROWS, random_state=0) if self.sampled else data
+        self.rows = len(profiled)
+        self.summary = pd.DataFrame({column: profile_column(profiled[column]) for column in data.columns}).T
+
+
+_lock = threading.Lock()
+_profiles = OrderedDict()  # (dataset key, sample) -> DatasetProfile
+
+
+def get_profile(key, data, sample=True):
+    with _lock:
+        profile = _profiles.get((key, sample))
+        if profile is not None:
+            _profiles.move_to_end((key, sample))
+            return profile
+    profile = DatasetProfile(data, sample)
+    with _lock:
+        _profiles[(key, sample)] = profile
+        while len(_profiles) > MAX_PROFILES:
+            _profiles.popitem(last=False)
+    return profile
@@ -0,0 +1,216 @@
+import os
+import re
+import time
+import random
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import OrderedDict, deque
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Per-provider budgets (can be overridden from .env)
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "15"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "60"))
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", "90000"))
+
+BACKOFF_BASE_SECONDS = float(os.getenv("BACKOFF_BASE_SECONDS", "1"))
+BACKOFF_MAX_SECONDS = float(os.getenv("BACKOFF_MAX_SECONDS", "60"))
+
+IMAGE_TOKENS = 258  # Gemini bills a fixed number of tokens per image
+
+
+def estimate_tokens(*parts, output_tokens=0):
+    # Rough estimate (~4 characters per token) used only for budgeting
+    tokens = output_tokens
+    for part in parts:
+        if isinstance(part, str):
+            tokens += len(part) // 4 + 1
+        elif part is not None:
+            tokens += IMAGE_TOKENS
+    return tokens
+
+
+_session = contextvars.ContextVar("session", default=None)
+
+
+@contextmanager
+def session_scope(session_id):
+    # Calls made in the block queue as this session, e.g. a background job working for it
+    token = _session.set(session_id)
+    try:
+        yield
+    finally:
+        _session.reset(token)
+
+
+def current_session_id():
+    # Session set by session_scope, else the Streamlit session running the script, else the thread
+    session_id = _session.get()
+    if session_id is not None:
+        return session_id
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        if ctx is not None:
+            return ctx.session_id
+    except ImportError:
+        pass
+    return f"thread-{threading.get_ident()}"
+
+
+class _Bucket:
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        missing = amount - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+
+class RateLimiter:
+    def __init__(self, name, requests_per_minute, tokens_per_minute):
+        self.name = name
+        self._requests = _Bucket(requests_per_minute)
+        self._tokens = _Bucket(tokens_per_minute)
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()  # session id -> deque of tickets, served round-robin
+        self._paused_until = 0.0
+        self._waits = deque(maxlen=500)
+
+    def _head(self):
+        for queue in self._queues.values():
+            return queue[0]
+        return None
+
+    def _pop_head(self):
+        session_id, queue = next(iter(self._queues.items()))
+        queue.popleft()
+        if queue:
+            self._queues.move_to_end(session_id)  # Give the other sessions a turn
+        else:
+            del self._queues[session_id]
+
+    def acquire(self, tokens=1, session_id=None):
+        session_id = session_id or current_session_id()
+        tokens = min(tokens, self._tokens.capacity)
+        ticket = object()
+        started = time.monotonic()
+        with self._cond:
+            self._queues.setdefault(session_id, deque()).append(ticket)
+            while True:
+                now = time.monotonic()
+                if self._head() is ticket:
+                    self._requests.refill(now)
+                    self._tokens.refill(now)
+                    delay = max(self._paused_until - now,
+                                self._requests.wait_time(1),
+                                self._tokens.wait_time(tokens))
+                    if delay <= 0:
+                        self._requests.level -= 1
+                        self._tokens.level -= tokens
+                        self._pop_head()
+                        self._cond.notify_all()
+                        break
+                    self._cond.wait(delay)
+                else:
+                    self._cond.wait()
+        waited = time.monotonic() - started
+        with self._cond:
+            self._waits.append(waited)
+        return waited
+
+    def pause(self, seconds):
+        # Provider said "slow down": hold back every caller, not just the one that got the error
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            waits = sorted(self._waits)
+            queue_depth = sum(len(queue) for queue in self._queues.values())
+            paused_for = max(0.0, self._paused_until - time.monotonic())
+            last_wait = self._waits[-1] if self._waits else 0.0
+        p95 = waits[int(0.95 * (len(waits) - 1))] if waits else 0.0
+        return {
+            "queue_depth": queue_depth,
+            "last_wait": last_wait,
+            "p95_wait": p95,
+            "paused_for": paused_for,
+        }
+
+
+gemini_limiter = RateLimiter("gemini", GEMINI_RPM, GEMINI_TPM)
+openai_limiter = RateLimiter("openai", OPENAI_RPM, OPENAI_TPM)
+
+
+def retry_after(exc):
+    # Look for a server hint in the attributes, headers or message of the error
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        headers = getattr(exc, "headers", None) or getattr(getattr(exc, "response", None), "headers", None)
+        if headers:
+            value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        match = (re.search(r"retry_delay\s*\{\s*seconds:\s*(\d+)", str(exc))
+                 or re.search(r"retry in ([\d.]+)\s*s", str(exc), re.IGNORECASE))
+        if match:
+            value = match.group(1)
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt, hint=None):
+    # Full jitter exponential backoff, never shorter than the server hint
+    delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+    if hint is not None:
+        delay = max(delay, hint)
+    return delay
+
+
+def _before_retry(attempt, e, limiter, on_retry):
+    # Delay before the next attempt; the limiter holds back everyone else meanwhile
+    delay = backoff_delay(attempt, retry_after(e))
+    if limiter is not None:
+        limiter.pause(delay)
+    if on_retry is not None:
+        on_retry(attempt, delay, e)
+    else:
+        logging.warning(f"Retrying in {delay:.1f}s after error: {e}")
+    return delay
+
+
+def call_with_backoff(fn, *args, retry_on=(Exception,), max_retries=3, limiter=None, on_retry=None, **kwargs):
+    for attempt in range(max_retries):
+        try:
+            return fn(*args, **kwargs)
+        except retry_on as e:
+            if attempt == max_retries - 1:
+                raise
+            time.sleep(_before_retry(attempt, e, limiter, on_retry))
+
+
+async def call_with_backoff_async(fn, *args, retry_on=(Exception,), max_retries=3, limiter=None, on_retry=None,
+                                  **kwargs):
+    # call_with_backoff for coroutine functions: waits without blocking the event loop
+    for attempt in range(max_retries):
+        try:
+            return await fn(*args, **kwargs)
+        except retry_on as e:
+            if attempt == max_retries - 1:
+                raise
+            await asyncio.sleep(_before_retry(attempt, e, limiter, on_retry))
@@ -0,0 +1,146 @@
+import os
+import hashlib
+import threading
+from io import BytesIO
+from xml.sax.saxutils import escape
+from collections import OrderedDict
+from dotenv import load_dotenv
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter, landscape
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import SimpleDocTemplate, LongTable, TableStyle, Paragraph, Spacer
+from table_parser import raw_tables
+
+load_dotenv()
+
+# Report settings (can be overridden from .env)
+PDF_CACHE_ENTRIES = int(os.getenv("PDF_CACHE_ENTRIES", "32"))
+PDF_CHUNK_ROWS = int(os.getenv("PDF_CHUNK_ROWS", "500"))
+
+FONT_SIZE = 6
+CELL_PADDING = 8  # Left + right padding reportlab puts around each cell
+WIDTH_SAMPLE_ROWS = 200  # Rows measured to size the columns
+
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.darkgrey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), FONT_SIZE),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+])
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # content hash -> PDF bytes
+
+
+def _column_widths(table_data, total_width):
+    # Natural width of each column from a sample of rows, scaled to fill the page width
+    columns = len(table_data[0])
+    natural = [0.0] * columns
+    for row in table_data[:WIDTH_SAMPLE_ROWS + 1]:
+        for i, cell in enumerate(row):
+            natural[i] = max(natural[i], stringWidth(str(cell), "Helvetica-Bold", FONT_SIZE) + CELL_PADDING)
+    # Keep tiny columns readable and stop one long column from squeezing the others out
+    floor = total_width / columns / 3
+    natural = [min(max(width, floor), total_width / 2) for width in natural]
+    scale = total_width / sum(natural)
+    return [width * scale for width in natural]
+
+
+def _wrap_long_cells(rows, widths, cell_style):
+    # Only cells wider than their column become Paragraphs: plain strings draw much faster
+    wrapped = []
+    for row in rows:
+        if any(stringWidth(str(cell), "Helvetica", FONT_SIZE) + CELL_PADDING > widths[i] for i, cell in enumerate(row)):
+            row = [Paragraph(escape(str(cell)), cell_style)
+                   if stringWidth(str(cell), "Helvetica", FONT_SIZE) + CELL_PADDING > widths[i] else cell
+                   for i, cell in enumerate(row)]
+        wrapped.append(row)
+    return wrapped
+
+
+def _table_flowables(table_data, total_width, cell_style):
+    # Chunks of LongTables: each one splits across pages on its own
+    widths = _column_widths(table_data, total_width)
+    header, rows = table_data[0], table_data[1:]
+    for start in range(0, max(len(rows), 1), PDF_CHUNK_ROWS):
+        chunk = _wrap_long_cells(rows[start:start + PDF_CHUNK_ROWS], widths, cell_style)
+        table = LongTable([header] + chunk, colWidths=widths, repeatRows=1, splitByRow=1)
+        table.setStyle(TABLE_STYLE)
+        yield table
+
+
+class _Deferred:
+    # Stands in the story for the flowables a generator hasn't built yet
+    def __init__(self, flowables):
+        self.flowables = flowables
+
+
+class _LazyDocTemplate(SimpleDocTemplate):
+    # Builds each flowable of a deferred story only when layout reaches it, so the chunks
+    # already drawn can be freed and the ones ahead don't exist yet
+
+    def filterFlowables(self, flowables):
+        if flowables and isinstance(flowables[0], _Deferred):
+            deferred = flowables[0]
+            flowable = next(deferred.flowables, None)
+            # None is skipped by the layout loop: the story ended
+            flowables[0:1] = [flowable, deferred] if flowable is not None else [None]
+
+
+def build_pdf(sections, title=None):
+    # sections: [(heading or None, [headers, row, ...]), ...] -> PDF bytes
+    widest = max((len(table_data[0]) for _, table_data in sections), default=0)
+    pagesize = landscape(letter) if widest > 6 else letter
+    buffer = BytesIO()
+    doc = _LazyDocTemplate(buffer, pagesize=pagesize)
+    styles = getSampleStyleSheet()
+    cell_style = styles['BodyText'].clone('Cell', fontSize=FONT_SIZE, leading=FONT_SIZE + 1)
+
+    def story():
+        if title:
+            yield Paragraph(title, styles['Title'])
+        for heading, table_data in sections:
+            if heading:
+                yield Paragraph(f"<b>{escape(heading)}</b>", styles['Heading2'])
+            yield from _table_flowables(table_data, doc.width, cell_style)
+            yield Spacer(1, 12)
+
+    # Memory follows the chunk being laid out plus the PDF written so far, not the whole story
+    doc.build([_Deferred(story())])
+    return buffer.getvalue()
+
+
+def _remember(key, pdf):
+    with _lock:
+        _cache[key] = pdf
+        while len(_cache) > PDF_CACHE_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def response_report(responses):
+    # PDF of the tables in one or more model responses, cached by their content.
+    # responses: [(heading, response text), ...]
+    digest = hashlib.sha256()
+    for heading, response in responses:
+        digest.update(f"{heading}\x00{response}\x00".encode("utf-8"))
+    key = digest.hexdigest()
+    with _lock:
+        pdf = _cache.get(key)
+        if pdf is not None:
+            _cache.move_to_end(key)
+            return pdf
+
+    sections = []
+    for heading, response in responses:
+        for i, table_data in enumerate(raw_tables(response)):
+            sections.append((heading if i == 0 else None, table_data))
+    pdf = build_pdf(sections)
+    _remember(key, pdf)
+    return pdf
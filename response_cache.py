@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cache settings (can be overridden from .env)
+CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llm_cache")
+CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+CACHE_DISK_MAX_BYTES = int(os.getenv("LLM_CACHE_DISK_MAX_BYTES", str(200 * 1024 * 1024)))
+CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+
+
+def _image_digest(image):
+    # Hash the decoded pixels so the same photo gives the same key whatever its container
+    if image is None:
+        return "none"
+    if isinstance(image, dict):
+        # Pre-processed blob: the encoding is deterministic, so hash its bytes directly
+        return hashlib.sha256(image["mime_type"].encode("utf-8") + image["data"]).hexdigest()
+    normalized = image.convert("RGB") if image.mode != "RGB" else image
+    digest = hashlib.sha256()
+    digest.update(f"{normalized.size[0]}x{normalized.size[1]}".encode("utf-8"))
+    digest.update(normalized.tobytes())
+    return digest.hexdigest()
+
+
+def make_cache_key(image, prompt, question, model_name):
+    digest = hashlib.sha256()
+    for part in (_image_digest(image), prompt or "", question or "", model_name):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")  # Separator so ("ab", "c") and ("a", "bc") differ
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, cache_dir=CACHE_DIR, memory_entries=CACHE_MEMORY_ENTRIES,
+                 disk_max_bytes=CACHE_DISK_MAX_BYTES, ttl_seconds=CACHE_TTL_SECONDS):
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()  # key -> (created, response)
+        self._lock = threading.Lock()
+        self._disk_bytes = None  # Computed lazily on first write
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _expired(self, created):
+        return self.ttl_seconds > 0 and time.time() - created > self.ttl_seconds
+
+    def _remember(self, key, created, response):
+        self._memory[key] = (created, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if not self._expired(entry[0]):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, entry["created"], entry["response"])
+            return entry["response"]
+
+    def put(self, key, response):
+        created = time.time()
+        with self._lock:
+            self._remember(key, created, response)
+        try:
+            self._write_disk(key, created, response)
+        except OSError as e:
+            logging.warning(f"Could not write response cache entry: {e}")
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._expired(entry.get("created", 0)):
+            self._remove(path)
+            return None
+        return entry
+
+    def _write_disk(self, key, created, response):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created": created, "response": response}, f)
+        os.replace(tmp_path, path)
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+            else:
+                self._disk_bytes += os.path.getsize(path)
+            over_budget = self._disk_bytes > self.disk_max_bytes
+        if over_budget:
+            self.evict()
+
+    def _disk_entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def evict(self):
+        # Drop expired entries first, then the oldest ones until we are back under budget
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        now = time.time()
+        total = sum(size for _, size, _ in entries)
+        for path, size, mtime in entries:
+            expired = self.ttl_seconds > 0 and now - mtime > self.ttl_seconds
+            if not expired and total <= self.disk_max_bytes:
+                continue
+            self._remove(path)
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
+
+
+# Shared by every Gemini caller in the process
+response_cache = ResponseCache()
@@ -0,0 +1,206 @@
+import os
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timezone
+import pandas as pd
+from dotenv import load_dotenv
+from normalize import column_fields, numeric_values
+
+load_dotenv()
+
+RESULTS_DB = os.getenv("RESULTS_DB", "lab_results.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS extractions (
+    id TEXT PRIMARY KEY,
+    extracted_at TEXT NOT NULL,
+    rows INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lab_results (
+    id INTEGER PRIMARY KEY,
+    extraction_id TEXT NOT NULL REFERENCES extractions(id),
+    extracted_at TEXT NOT NULL,
+    source TEXT,
+    patient TEXT,
+    parameter TEXT,
+    unit TEXT,
+    result TEXT,
+    result_value REAL,
+    reference TEXT
+);
+CREATE TABLE IF NOT EXISTS image_hashes (
+    id INTEGER PRIMARY KEY,
+    dhash INTEGER NOT NULL,
+    source TEXT,
+    response TEXT NOT NULL,
+    added_at TEXT NOT NULL
+);
+"""
+
+# Added after the first release of the store; older databases are migrated on connect
+CANONICAL_COLUMNS = {"canonical_parameter": "TEXT", "canonical_value": "REAL", "canonical_unit": "TEXT"}
+
+# Parameter filters match the canonical name when the label was recognised, so one filter
+# covers "Glycémie" and "Glucose" across reports
+PARAMETER_KEY = "COALESCE(canonical_parameter, parameter)"
+
+INDEXES = f"""
+CREATE INDEX IF NOT EXISTS idx_results_patient ON lab_results(patient, extracted_at);
+CREATE INDEX IF NOT EXISTS idx_results_patient_parameter ON lab_results(patient, {PARAMETER_KEY}, extracted_at);
+CREATE INDEX IF NOT EXISTS idx_results_parameter ON lab_results({PARAMETER_KEY}, extracted_at);
+CREATE INDEX IF NOT EXISTS idx_results_date ON lab_results(extracted_at);
+"""
+
+STORE_FIELDS = ["source", "patient", "parameter", "unit", "result", "reference",
+                "canonical_parameter", "canonical_value", "canonical_unit"]
+
+# Store column -> column name shown on the data pages
+DISPLAY_COLUMNS = {
+    "patient": "Name", "parameter": "Parameter", "unit": "Unit", "result": "Result",
+    "result_value": "Result Value", "reference": "Value", "canonical_parameter": "Standard Parameter",
+    "canonical_value": "Standard Result", "canonical_unit": "Standard Unit", "extracted_at": "Extracted At",
+    "source": "Source",
+}
+
+_local = threading.local()
+
+
+def _connection():
+    # One connection per thread; WAL lets the pages read while an extraction is written
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        connection = sqlite3.connect(RESULTS_DB, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        existing = {row[1] for row in connection.execute("PRAGMA table_info(lab_results)")}
+        if not existing.issuperset(CANONICAL_COLUMNS):
+            # Other threads (or batch_extract next to the app) may be migrating the same file:
+            # take the write lock first and look at the columns again under it
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                existing = {row[1] for row in connection.execute("PRAGMA table_info(lab_results)")}
+                for column, kind in CANONICAL_COLUMNS.items():
+                    if column not in existing:
+                        connection.execute(f"ALTER TABLE lab_results ADD COLUMN {column} {kind}")
+                # Parameter indexes were on the raw label; rebuilt below on the canonical key
+                connection.execute("DROP INDEX IF EXISTS idx_results_patient_parameter")
+                connection.execute("DROP INDEX IF EXISTS idx_results_parameter")
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        connection.executescript(INDEXES)
+        _local.connection = connection
+    return connection
+
+
+def append_results(extraction_id, df, source=None):
+    # Store every row of an extracted table; the same extraction is only stored once
+    if df.empty:
+        return 0
+    fields = column_fields(df.columns)
+    if "result" not in fields:
+        logging.warning(f"Not storing extraction {extraction_id}: no result column in {list(df.columns)}")
+        return 0
+
+    records = pd.DataFrame({field: df[fields[field]] if field in fields else None for field in STORE_FIELDS})
+    if "source" not in fields:
+        records["source"] = source
+    records["result_value"] = numeric_values(records["result"])
+    records = records.astype(object).where(records.notna(), None)
+    records["result"] = records["result"].map(lambda value: None if value is None else str(value))
+    extracted_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    connection = _connection()
+    with connection:
+        inserted = connection.execute(
+            "INSERT OR IGNORE INTO extractions (id, extracted_at, rows) VALUES (?, ?, ?)",
+            (extraction_id, extracted_at, len(records)),
+        ).rowcount
+        if not inserted:
+            return 0
+        connection.executemany(
+            "INSERT INTO lab_results (extraction_id, extracted_at, source, patient, parameter, unit, "
+            "result, result_value, reference, canonical_parameter, canonical_value, canonical_unit) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(extraction_id, extracted_at, row.source, row.patient, row.parameter, row.unit, row.result,
+              row.result_value, row.reference, row.canonical_parameter, row.canonical_value, row.canonical_unit)
+             for row in records.itertuples(index=False)],
+        )
+    return len(records)
+
+
+def list_patients():
+    rows = _connection().execute(
+        "SELECT DISTINCT patient FROM lab_results WHERE patient IS NOT NULL ORDER BY patient").fetchall()
+    return [row[0] for row in rows]
+
+
+def list_parameters(patient=None):
+    if patient is None:
+        rows = _connection().execute(
+            f"SELECT DISTINCT {PARAMETER_KEY} AS name FROM lab_results WHERE name IS NOT NULL "
+            "ORDER BY name").fetchall()
+    else:
+        rows = _connection().execute(
+            f"SELECT DISTINCT {PARAMETER_KEY} AS name FROM lab_results WHERE patient = ? AND name IS NOT NULL "
+            "ORDER BY name", (patient,)).fetchall()
+    return [row[0] for row in rows]
+
+
+def store_version():
+    # Changes whenever rows are added, so callers can key their caches on it
+    row = _connection().execute("SELECT COALESCE(MAX(id), 0) FROM lab_results").fetchone()
+    return row[0]
+
+
+def query_results(patient=None, parameters=None, since=None, until=None, limit=None):
+    # Filters are pushed down to SQLite so they use the indexes; dates are ISO strings
+    clauses, params = [], []
+    if patient is not None:
+        clauses.append("patient = ?")
+        params.append(patient)
+    if parameters:
+        clauses.append(f"{PARAMETER_KEY} IN ({', '.join('?' * len(parameters))})")
+        params.extend(parameters)
+    if since is not None:
+        clauses.append("extracted_at >= ?")
+        params.append(str(since))
+    if until is not None:
+        clauses.append("extracted_at < ?")
+        params.append(str(until))
+    sql = ("SELECT patient, parameter, unit, result, result_value, reference, canonical_parameter, "
+           "canonical_value, canonical_unit, extracted_at, source FROM lab_results")
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    sql += " ORDER BY extracted_at, id"
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
+    data = pd.read_sql_query(sql, _connection(), params=params)
+    data["extracted_at"] = pd.to_datetime(data["extracted_at"], utc=True)
+    return data.rename(columns=DISPLAY_COLUMNS)
+
+
+def add_image_hash(dhash, source, response):
+    # Perceptual hash of an extracted photo with the answer it got; SQLite integers are signed
+    added_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    connection = _connection()
+    with connection:
+        return connection.execute(
+            "INSERT INTO image_hashes (dhash, source, response, added_at) VALUES (?, ?, ?, ?)",
+            (dhash - (1 << 64) if dhash >= 1 << 63 else dhash, source, response, added_at),
+        ).lastrowid
+
+
+def image_hashes(after_id=0):
+    # (id, hash) pairs added since after_id, for the in-memory index to catch up
+    rows = _connection().execute(
+        "SELECT id, dhash FROM image_hashes WHERE id > ? ORDER BY id", (after_id,)).fetchall()
+    return [(row_id, dhash & ((1 << 64) - 1)) for row_id, dhash in rows]
+
+
+def image_response(hash_id):
+    # (source, response, added_at) stored with a hash
+    return _connection().execute(
+        "SELECT source, response, added_at FROM image_hashes WHERE id = ?", (hash_id,)).fetchone()
@@ -0,0 +1,181 @@
+import re
+import math
+import logging
+import pandas as pd
+
+# Markdown separator row such as |---|:---:|---|
+SEPARATOR_ROW = re.compile(r"^\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?$")
+# A plain number with '.' or ',' decimals. Qualified results such as "<5" are not numbers:
+# converting them would drop the qualifier, so their column stays text.
+NUMBER = re.compile(r"^[-+]?\d+(?:[.,]\d+)?$")
+# "1,234" may be 1234 or 1.234 depending on the lab's locale; a column holding one stays text
+AMBIGUOUS_NUMBER = re.compile(r"^[-+]?[1-9]\d{0,2},\d{3}$")
+
+
+def split_cells(line):
+    # Cells between pipes; the outer pipes are optional, empty inner cells are kept
+    line = line.strip()
+    if line.startswith("|"):
+        line = line[1:]
+    if line.endswith("|"):
+        line = line[:-1]
+    return [cell.strip() for cell in line.split("|")]
+
+
+class TableParser:
+    # Line-by-line parser shared by the blocking and streaming paths.
+    # Any line with a '|' belongs to a table, the first one being its header; separator
+    # rows are skipped; a line without '|' closes the table, so one response can hold
+    # several tables. Ragged rows are padded or truncated to the header width.
+
+    def __init__(self):
+        self.tables = []  # [headers, rows] pairs
+        self._current = None
+
+    def feed_line(self, line):
+        # Returns the completed row, if this line produced one
+        stripped = line.strip()
+        if "|" not in stripped:
+            self._current = None
+            return None
+        if SEPARATOR_ROW.match(stripped):
+            return None
+        cells = split_cells(stripped)
+        if self._current is None:
+            self._current = [cells, []]
+            self.tables.append(self._current)
+            return None
+        if not any(cells):
+            return None
+        width = len(self._current[0])
+        row = cells[:width] + [""] * (width - len(cells))
+        self._current[1].append(row)
+        return row
+
+
+def _unique_headers(headers):
+    seen = {}
+    unique = []
+    for i, header in enumerate(headers):
+        header = header or f"Column{i + 1}"
+        count = seen.get(header, 0)
+        seen[header] = count + 1
+        unique.append(header if count == 0 else f"{header}_{count + 1}")
+    return unique
+
+
+def to_frame(headers, rows):
+    # Typed DataFrame: a column becomes numeric only when every filled cell is a plain,
+    # unambiguous number, so the displayed and downloaded values are the ones on the report
+    df = pd.DataFrame(rows, columns=_unique_headers(headers))
+    for i, column in enumerate(df.columns):
+        # A text column is rejected on its first filled cell, before the whole column is scanned
+        first = next((row[i] for row in rows if row[i]), "")
+        if not NUMBER.match(first):
+            continue
+        values = [row[i] for row in rows]
+        filled = [value for value in values if value]
+        if not all(map(NUMBER.match, filled)) or any(map(AMBIGUOUS_NUMBER.match, filled)):
+            continue
+        df[column] = [float(value.replace(",", ".")) if value else math.nan for value in values]
+    return df
+
+
+def _parse(response):
+    # Same rules as TableParser.feed_line, inlined: this is the hot loop for whole responses
+    # (benchmarks/fuzz_parser.py checks both give the same rows)
+    tables = []
+    rows = None
+    width = 0
+    separator = SEPARATOR_ROW.match
+    for line in response.split("\n"):
+        if "|" not in line:
+            rows = None
+            continue
+        line = line.strip()
+        if "---" in line and separator(line):
+            continue
+        if line.startswith("|"):
+            line = line[1:]
+        if line.endswith("|"):
+            line = line[:-1]
+        cells = [cell.strip() for cell in line.split("|")]
+        if rows is None:
+            rows = []
+            width = len(cells)
+            tables.append((cells, rows))
+            continue
+        if not any(cells):
+            continue
+        if len(cells) != width:
+            cells = cells[:width] + [""] * (width - len(cells))
+        rows.append(cells)
+    return [(headers, rows) for headers, rows in tables if rows]
+
+
+def raw_tables(response):
+    # [[headers, row, row, ...], ...] as strings, for renderers such as the PDF export
+    return [[headers] + rows for headers, rows in _parse(response)]
+
+
+def _header_key(headers):
+    return tuple(header.casefold() for header in headers)
+
+
+def parse_tables(response):
+    # One DataFrame per distinct header: tables repeating a header (a report split in
+    # sections or pages) are merged, tables with other columns stay separate
+    groups = {}
+    for headers, rows in _parse(response):
+        group = groups.setdefault(_header_key(headers), (headers, []))
+        group[1].extend(rows)
+    return [to_frame(headers, rows) for headers, rows in groups.values()]
+
+
+def parse_table(response):
+    # The main table of the response: the one with the most rows once same-header tables are merged
+    tables = parse_tables(response)
+    if not tables:
+        return pd.DataFrame()
+    main = max(tables, key=len)
+    if len(tables) > 1:
+        logging.info(f"Response holds {len(tables)} tables with different headers; using the "
+                     f"largest ({len(main)} rows), other columns: "
+                     f"{[list(table.columns) for table in tables if table is not main]}")
+    return main
+
+
+class StreamingTableParser:
+    # Feeds a response chunk by chunk and emits rows as soon as their line is complete
+
+    def __init__(self):
+        self._parser = TableParser()
+        self._pending = ""
+
+    def feed(self, chunk):
+        # Returns the rows completed by this chunk; a partial last line waits for the next one
+        self._pending += chunk
+        *lines, self._pending = self._pending.split("\n")
+        new_rows = []
+        for line in lines:
+            row = self._parser.feed_line(line)
+            if row is not None:
+                new_rows.append(row)
+        return new_rows
+
+    def close(self):
+        line, self._pending = self._pending, ""
+        row = self._parser.feed_line(line)
+        return [] if row is None else [row]
+
+    def frame(self):
+        # Rows parsed so far, as strings (typing happens once the response is complete), for
+        # the same table parse_table will pick
+        groups = {}
+        for headers, rows in self._parser.tables:
+            group = groups.setdefault(_header_key(headers), (headers, []))
+            group[1].extend(rows)
+        headers, rows = max(groups.values(), key=lambda group: len(group[1]), default=(None, []))
+        if not rows:
+            return pd.DataFrame()
+        return pd.DataFrame(rows, columns=_unique_headers(headers))
@@ -0,0 +1,130 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import streamlit as st
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Table rendering settings (can be overridden from .env)
+TABLE_PAGE_ROWS = int(os.getenv("TABLE_PAGE_ROWS", "200"))  # Rows sent to the browser per page
+MAX_VIEWS = 32  # Tables whose sort orders and filters stay cached
+MAX_SELECTIONS = 8  # Filter + sort combinations kept per table
+ALL_COLUMNS = "All columns"
+NO_SORT = "Original order"
+
+
+class TableView:
+    # Built once per table: sort permutations per column and row selections per filter, so a
+    # rerun, a new page or a new sort direction is a positional take of one page of rows
+
+    def __init__(self, data):
+        self.data = data
+        self._orders = {}  # column -> (ascending positions with nulls last, non-null count)
+        self._selections = OrderedDict()  # (query, filter column, sort column, descending) -> positions
+        self._lock = threading.Lock()
+
+    def _order(self, column):
+        with self._lock:
+            cached = self._orders.get(column)
+        if cached is not None:
+            return cached
+        values = self.data[column].reset_index(drop=True)
+        try:
+            positions = values.sort_values(kind="stable", na_position="last").index.to_numpy()
+        except TypeError:  # Text column mixing numbers and strings: sort on the text
+            text = values.where(values.isna(), values.astype(str))
+            positions = text.sort_values(kind="stable", na_position="last").index.to_numpy()
+        cached = (positions, int(values.notna().sum()))
+        with self._lock:
+            self._orders[column] = cached
+        return cached
+
+    def _matches(self, query, column=None):
+        # Case-insensitive substring match on one column or any of them
+        mask = np.zeros(len(self.data), dtype=bool)
+        for name in ([column] if column is not None else self.data.columns):
+            values = self.data[name]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Each category is matched once, then spread to the rows through the codes
+                hits = np.asarray(values.cat.categories.astype(str).str.contains(query, case=False, regex=False))
+                codes = values.cat.codes.to_numpy()
+                mask |= (codes >= 0) & hits[codes]
+            else:
+                text = values.astype(str).str.contains(query, case=False, regex=False).to_numpy(dtype=bool)
+                mask |= values.notna().to_numpy() & text
+        return mask
+
+    def positions(self, query="", filter_column=None, sort_column=None, descending=False):
+        # Row positions to show, in order
+        key = (query, filter_column, sort_column, descending)
+        with self._lock:
+            cached = self._selections.get(key)
+            if cached is not None:
+                self._selections.move_to_end(key)
+                return cached
+        if sort_column is None:
+            positions = np.arange(len(self.data))
+        else:
+            positions, valid = self._order(sort_column)
+            if descending:
+                # Nulls stay last in both directions
+                positions = np.concatenate([positions[:valid][::-1], positions[valid:]])
+        if query:
+            positions = positions[self._matches(query, filter_column)[positions]]
+        with self._lock:
+            self._selections[key] = positions
+            while len(self._selections) > MAX_SELECTIONS:
+                self._selections.popitem(last=False)
+        return positions
+
+    def rows(self, positions, start=0, stop=None):
+        return self.data.iloc[positions[start:stop]]
+
+
+_lock = threading.Lock()
+_views = OrderedDict()  # table key -> TableView
+
+
+def get_table_view(key, data):
+    with _lock:
+        view = _views.get(key)
+        if view is not None:
+            _views.move_to_end(key)
+            return view
+    view = TableView(data)
+    with _lock:
+        _views[key] = view
+        while len(_views) > MAX_VIEWS:
+            _views.popitem(last=False)
+    return view
+
+
+def show_table(data, key, name, page_rows=TABLE_PAGE_ROWS):
+    # Filter, sort and page controls over a cached view; only the current page goes to the
+    # browser. `key` identifies the table content, `name` keeps the widgets of each table apart.
+    if len(data) <= page_rows:
+        st.dataframe(data)
+        return
+    view = get_table_view(key, data)
+    columns = list(data.columns)
+    filter_area, column_area, sort_area, order_area = st.columns([3, 2, 2, 1])
+    query = filter_area.text_input("Filter rows", key=f"{name}_filter").strip()
+    filter_column = column_area.selectbox("In", [ALL_COLUMNS] + columns, key=f"{name}_filter_column")
+    sort_column = sort_area.selectbox("Sort by", [NO_SORT] + columns, key=f"{name}_sort")
+    descending = order_area.checkbox("Descending", key=f"{name}_descending")
+
+    positions = view.positions(query, None if filter_column == ALL_COLUMNS else filter_column,
+                               None if sort_column == NO_SORT else sort_column, descending)
+    total = len(positions)
+    pages = max(1, -(-total // page_rows))
+    page_key = f"{name}_page"
+    if st.session_state.get(page_key, 1) > pages:
+        st.session_state[page_key] = pages  # A narrower filter left the page past the end
+    page = st.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, step=1, key=page_key)
+    start = (page - 1) * page_rows
+    st.dataframe(view.rows(positions, start, start + page_rows))
+    shown = f"Rows {start + 1:,}–{min(start + page_rows, total):,} of {total:,}" if total else "No matching rows"
+    st.caption(shown + (f" (filtered from {len(data):,})" if total != len(data) else ""))
@@ -0,0 +1,30 @@
+import os
+import sys
+import json
+import subprocess
+from benchmarks.bench_imports import HEAVY_MODULES, BASELINE_MODULES, is_heavy, login_path_imports
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded_modules(modules):
+    # sys.modules of a fresh interpreter after importing `modules` from the repo root
+    code = "; ".join(["import sys, json"] + [f"import {module}" for module in modules]
+                     + ["print(json.dumps(sorted(sys.modules)))"])
+    result = subprocess.run([sys.executable, "-c", code], cwd=REPO_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return set(json.loads(result.stdout.splitlines()[-1]))
+
+
+def test_login_path_loads_no_heavy_modules(monkeypatch):
+    monkeypatch.chdir(REPO_DIR)
+    external, local_files = login_path_imports()
+    # app.py itself is a Streamlit script; every module it imports at top level is imported here
+    local = [path[:-len(".py")].replace(os.sep, ".") for path in local_files if path != "app.py"]
+    assert not [module for module in external if is_heavy(module)]
+
+    # Streamlit and pandas load some of these on their own (pandas imports pyarrow when installed)
+    baseline = loaded_modules(BASELINE_MODULES)
+    loaded = loaded_modules(local + external) - baseline
+    assert sorted(module for module in loaded if is_heavy(module)) == []
+    assert {"google.generativeai", "openai", "reportlab", "fitz", "pymupdf", "pyarrow"} <= set(HEAVY_MODULES)
@@ -0,0 +1,35 @@
+import pandas as pd
+from normalize import relabel_columns, column_fields, numeric_values, STANDARD_PARAMETER, STANDARD_RESULT, STANDARD_UNIT
+
+
+def test_recognised_five_column_headers_are_not_relabeled_by_position():
+    df = pd.DataFrame({
+        "Analyse": ["Glycémie", "Hémoglobine"],
+        "Résultat": ["1,10", "13.5"],
+        "Unité": ["g/L", "g/dL"],
+        "Normes": ["0.70 - 1.10", "12 - 16"],
+        "Antériorité": ["0.95", "13.1"],
+    })
+    result = relabel_columns(df)
+
+    assert list(result.columns[:5]) == ["Analyse", "Résultat", "Unité", "Normes", "Antériorité"]
+    assert "patient" not in column_fields(result.columns)
+    assert list(result[STANDARD_PARAMETER]) == ["Glucose", "Hemoglobin"]
+    assert list(result[STANDARD_UNIT]) == ["mmol/L", "g/dL"]
+    assert result[STANDARD_RESULT].round(3).tolist() == [6.106, 13.5]
+
+
+def test_unrecognised_five_column_headers_get_the_standard_ones():
+    df = pd.DataFrame([["Dupont", "Glycémie", "g/L", "1,10", "0.70 - 1.10"]],
+                      columns=["Patient name", "Test name", "U", "Res", "Ref"])
+    result = relabel_columns(df)
+
+    assert list(result.columns[:5]) == ["Name", "Parameter", "Unit", "Result", "Value"]
+    assert result[STANDARD_PARAMETER].tolist() == ["Glucose"]
+
+
+def test_qualified_results_stay_out_of_the_numeric_columns():
+    values = numeric_values(pd.Series(["5,2", "<5", ">= 90", " 7.1 ", "positive"]))
+
+    assert values.iloc[0] == 5.2 and values.iloc[3] == 7.1
+    assert values.iloc[[1, 2, 4]].isna().all()
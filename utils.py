@@ -1,11 +1,10 @@
-import os
-import google.generativeai as genai
-from dotenv import load_dotenv
-
-load_dotenv()
-
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=GOOGLE_API_KEY)
+import time
+import logging
+import pandas as pd
+from response_cache import response_cache, make_cache_key
+from clients import GEMINI_MODEL, generate_content
+from metrics import span, record
+from table_parser import parse_table
 
 def load_prompt():
     input_prompt = """
@@ -16,7 +15,59 @@ def load_prompt():
                    """
     return input_prompt
 
+MODEL_NAME = GEMINI_MODEL
+
+def extract_table_from_response(response):
+    try:
+        # Single pass over the response: header detection, separator rows, ragged rows
+        # and several tables per response are handled by table_parser
+        with span("table.parse", response_chars=len(response)) as fields:
+            df = parse_table(response)
+            fields["rows"] = len(df)
+        logging.info(f"Extracted table with shape {df.shape}")
+        return df
+    except Exception as e:
+        logging.error(f"Error extracting table data: {e}")
+        return pd.DataFrame()  # Return empty DataFrame in case of any error
+
+def _payload_fields(input_question, prompt, image):
+    image_bytes = len(image["data"]) if isinstance(image, dict) else None
+    return {"prompt_chars": len(prompt or "") + len(input_question or ""), "image_bytes": image_bytes}
+
 def generate_response_llm(input_question, prompt, image):
-    model = genai.GenerativeModel("gemini-1.5-pro-latest")
-    response = model.generate_content([input_question, prompt, image])
-    return response.text
\ No newline at end of file
+    with span("llm.generate", **_payload_fields(input_question, prompt, image)) as fields:
+        # Same image, prompt and question give the same answer: serve it from the cache
+        cache_key = make_cache_key(image, prompt, input_question, MODEL_NAME)
+        cached = response_cache.get(cache_key)
+        fields["cache"] = "miss" if cached is None else "hit"
+        if cached is not None:
+            fields["response_chars"] = len(cached)
+            return cached
+
+        # Upload and model latency are one SDK call, so they share this span
+        with span("llm.call", model=MODEL_NAME):
+            response = generate_content([input_question, prompt, image], model_name=MODEL_NAME)
+        response_cache.put(cache_key, response.text)
+        fields["response_chars"] = len(response.text)
+        return response.text
+
+def generate_response_llm_stream(input_question, prompt, image):
+    # Yields the response text chunk by chunk; the joined text is what generate_response_llm returns
+    with span("llm.stream", **_payload_fields(input_question, prompt, image)) as fields:
+        cache_key = make_cache_key(image, prompt, input_question, MODEL_NAME)
+        cached = response_cache.get(cache_key)
+        fields["cache"] = "miss" if cached is None else "hit"
+        if cached is not None:
+            fields["response_chars"] = len(cached)
+            yield cached
+            return
+
+        chunks = []
+        started = time.perf_counter()
+        for chunk in generate_content([input_question, prompt, image], model_name=MODEL_NAME, stream=True):
+            if not chunks:
+                record("llm.first_chunk", (time.perf_counter() - started) * 1000, model=MODEL_NAME)
+            chunks.append(chunk.text)
+            yield chunk.text
+        response_cache.put(cache_key, "".join(chunks))
+        fields["response_chars"] = sum(len(chunk) for chunk in chunks)
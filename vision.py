@@ -1,60 +1,36 @@
 from dotenv import load_dotenv
 import streamlit as st
-import os
 from PIL import Image
-import google.generativeai as genai
 from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
+from reports import build_pdf
+from response_cache import response_cache, make_cache_key
+from clients import GEMINI_VISION_MODEL, generate_content
+from preprocess import preprocess_image, format_report
+from table_parser import raw_tables
 
 load_dotenv()  # Load environment variables from .env
 
-# Configure the Google Generative AI API key
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+VISION_MODEL_NAME = GEMINI_VISION_MODEL  # Set GEMINI_VISION_MODEL in .env to change it
 
 # Function to load Gemini model and get responses
 def get_gemini_response(input_text, image):
-    model = genai.GenerativeModel('gemini-1.5-flash')  # Update with the appropriate model
+    # Shares the response cache with the Extractor (no system prompt here)
+    cache_key = make_cache_key(image, "", input_text, VISION_MODEL_NAME)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     if input_text != "":
-        response = model.generate_content([input_text, image])
+        response = generate_content([input_text, image], model_name=VISION_MODEL_NAME)
     else:
-        response = model.generate_content(image)
+        response = generate_content(image, model_name=VISION_MODEL_NAME)
+    response_cache.put(cache_key, response.text)
     return response.text
 
 # Function to convert extracted data to a PDF
 def create_pdf(data):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    story = []
-
-    styles = getSampleStyleSheet()
-
-    col_widths = [doc.width * 0.3] * len(data[0])  # Adjust according to the number of columns
-
-    response_table = Table(data, colWidths=col_widths)
-
-    response_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.darkgrey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-    ]))
-
-    story.append(Paragraph("<b>Analysis Report</b>", styles['Title']))
-    story.append(response_table)
-
-    doc.build(story)
-
-    buffer.seek(0)
-    return buffer
+    # Shared paginated renderer: LongTable, auto-sized columns, page splitting
+    return BytesIO(build_pdf([(None, data)], title="<b>Analysis Report</b>"))
 
 # Initialize Streamlit app
 st.set_page_config(page_title="Gemini Image Demo")
@@ -66,8 +42,9 @@ uploaded_file = st.file_uploader("Choose an image...", type=["jpg", "jpeg", "png
 
 image = None
 if uploaded_file is not None:
-    image = Image.open(uploaded_file)
-    st.image(image, caption="Uploaded Image.", use_column_width=True)
+    preview, image, report = preprocess_image(Image.open(uploaded_file), original_bytes=uploaded_file.size)
+    st.image(preview, caption="Uploaded Image.", use_column_width=True)
+    st.caption(format_report(report))
 
 # Generate and display response
 if st.button("Tell me about the image"):
@@ -76,10 +53,11 @@ if st.button("Tell me about the image"):
     st.write(response)
 
     try:
-        # Parse the response to get the table data directly
-        response_lines = response.strip().split("\n")
-        # Convert response_lines directly to list of lists
-        data = [line.split("|") for line in response_lines]  # Adjust based on actual separator
+        # Parse the response with the shared table parser (same rules as the Extractor)
+        tables = raw_tables(response)
+        if not tables:
+            raise ValueError("no table found in the response")
+        data = tables[0]
 
         # Generate PDF and provide download link
         pdf_buffer = create_pdf(data)